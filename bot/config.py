@@ -31,7 +31,79 @@ class Config:
     SUBSCRIPTION_DAYS: int = 30
 
     # Parser intervals (seconds)
-    PARSE_INTERVAL: int = 60
+    PARSE_INTERVAL: int = 60          # стартовый интервал каждой биржи
+    PARSE_INTERVAL_MIN: int = int(os.getenv("PARSE_INTERVAL_MIN", 30))
+    PARSE_INTERVAL_MAX: int = int(os.getenv("PARSE_INTERVAL_MAX", 600))
+    PARSE_JITTER: float = float(os.getenv("PARSE_JITTER", 0.1))
+    POLL_TARGET_NEW: float = float(os.getenv("POLL_TARGET_NEW", 2))  # новых заказов за опрос
+
+    # HTTP-пул парсеров
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", 30))
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 4))
+    HTTP_DNS_TTL: int = int(os.getenv("HTTP_DNS_TTL", 600))
+    HTTP_KEEPALIVE: int = int(os.getenv("HTTP_KEEPALIVE", 75))
+    HTTP_TIMEOUT: int = int(os.getenv("HTTP_TIMEOUT", 15))
+
+    # Процессы для разбора HTML (0 — разбирать в event loop)
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", 2))
+
+    # Watermark: сколько хешей помнить на биржу и после скольких
+    # известных карточек подряд прекращать разбор (защита от закреплённых)
+    WATERMARK_SIZE: int = int(os.getenv("WATERMARK_SIZE", 500))
+    WATERMARK_STOP_AFTER: int = int(os.getenv("WATERMARK_STOP_AFTER", 3))
+
+    # Сколько страниц листинга максимум обходить, если все карточки новые
+    PAGINATION_MAX_PAGES: int = int(os.getenv("PAGINATION_MAX_PAGES", 3))
+
+    # Сколько лент категорий одной биржи запрашивать одновременно
+    CATEGORY_CONCURRENCY: int = int(os.getenv("CATEGORY_CONCURRENCY", 3))
+
+    # Таймаут опроса одной биржи и предохранитель (circuit breaker)
+    PARSE_TIMEOUT: int = int(os.getenv("PARSE_TIMEOUT", 20))
+    BREAKER_THRESHOLD: int = int(os.getenv("BREAKER_THRESHOLD", 3))
+    BREAKER_BASE_DELAY: int = int(os.getenv("BREAKER_BASE_DELAY", 60))
+    BREAKER_MAX_DELAY: int = int(os.getenv("BREAKER_MAX_DELAY", 1800))
+
+    # Обработка апдейтов из webhook: сколько обработчиков одновременно,
+    # сколько апдейтов держать в очереди (дальше — 503) и сколько ждать при остановке
+    UPDATE_CONCURRENCY: int = int(os.getenv("UPDATE_CONCURRENCY", 16))
+    UPDATE_QUEUE_LIMIT: int = int(os.getenv("UPDATE_QUEUE_LIMIT", 1000))
+    UPDATE_DRAIN_TIMEOUT: float = float(os.getenv("UPDATE_DRAIN_TIMEOUT", 10))
+
+    # Отправка уведомлений: общий лимит Telegram ~30 сообщений/с,
+    # в один чат — не чаще раза в секунду
+    DELIVERY_WORKERS: int = int(os.getenv("DELIVERY_WORKERS", 16))
+    DELIVERY_RATE: float = float(os.getenv("DELIVERY_RATE", 28))
+    DELIVERY_CHAT_INTERVAL: float = float(os.getenv("DELIVERY_CHAT_INTERVAL", 1.0))
+    DELIVERY_MAX_ATTEMPTS: int = int(os.getenv("DELIVERY_MAX_ATTEMPTS", 5))
+    DELIVERY_RETRY_BASE: float = float(os.getenv("DELIVERY_RETRY_BASE", 2.0))
+
+    # Сводки (instant_notify = False): как часто и по сколько заказов в сообщении
+    DIGEST_INTERVAL: int = int(os.getenv("DIGEST_INTERVAL", 1800))
+    DIGEST_PAGE_SIZE: int = int(os.getenv("DIGEST_PAGE_SIZE", 8))
+    DIGEST_MAX_ORDERS: int = int(os.getenv("DIGEST_MAX_ORDERS", 40))
+
+    # Конвейер: какие стадии запускать в этом процессе (scraper, matcher, sender)
+    PIPELINE_ROLES: str = os.getenv("PIPELINE_ROLES", "scraper,matcher,sender")
+    # Сколько строк забирать за раз, на сколько секунд захватывать строку outbox
+    # и как часто проверять таблицы, если никто не разбудил
+    OUTBOX_BATCH: int = int(os.getenv("OUTBOX_BATCH", 200))
+    OUTBOX_LEASE: int = int(os.getenv("OUTBOX_LEASE", 300))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", 2.0))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 3))
+
+    # Лидер планировщика среди реплик: срок аренды (продлевается каждую треть срока)
+    LEADER_LEASE_TTL: int = int(os.getenv("LEADER_LEASE_TTL", 30))
+
+    # Как часто сверять получателей рассылки в памяти с БД
+    SUBSCRIBER_RECONCILE_INTERVAL: int = int(os.getenv("SUBSCRIBER_RECONCILE_INTERVAL", 300))
+    # и как часто подхватывать изменения из других процессов (по users.updated_at)
+    SUBSCRIBER_POLL_INTERVAL: int = int(os.getenv("SUBSCRIBER_POLL_INTERVAL", 15))
+
+    # Журнал отправленных: сколько последних заказов на чат держать в памяти
+    # и сколько дней хранить записи в БД
+    SENT_CACHE_SIZE: int = int(os.getenv("SENT_CACHE_SIZE", 2000))
+    DELIVERY_LOG_DAYS: int = int(os.getenv("DELIVERY_LOG_DAYS", 14))
 
     # Categories
     CATEGORIES: dict = field(default_factory=lambda: {
@@ -78,4 +150,9 @@ class Config:
     })
 
 
+    @property
+    def pipeline_roles(self) -> set:
+        return {r.strip() for r in self.PIPELINE_ROLES.split(",") if r.strip()}
+
+
 config = Config()
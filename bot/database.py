@@ -1,8 +1,15 @@
+from typing import Iterable, List, Set
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import text
-from bot.models import Base
+from sqlalchemy import insert, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from bot.models import Base, ParsedOrder, User
 from bot.config import config
 
+# Строк в одном IN / многострочном INSERT: держимся ниже лимита
+# параметров запроса (32766 у SQLite, 32767 у asyncpg)
+BULK_CHUNK = 500
+
 
 def get_database_url() -> str:
     url = config.DATABASE_URL
@@ -40,11 +47,140 @@ async def init_db():
     """Безопасное создание таблиц (без удаления данных)"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await _migrate_access_until(conn)
+        await _migrate_matched_at(conn)
 
     db_display = DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL
     print(f"✅ Database initialized: {db_display}")
 
 
+async def _migrate_access_until(conn):
+    """
+    users.access_until для баз, созданных до появления колонки:
+    create_all не добавляет колонки в существующие таблицы.
+    Каждый шаг идемпотентен — прерванная миграция доделается при следующем старте.
+    """
+    columns = await conn.run_sync(
+        lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns("users")}
+    )
+    if "access_until" not in columns:
+        await conn.execute(text("ALTER TABLE users ADD COLUMN access_until TIMESTAMP"))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_users_eligible "
+        "ON users (parser_active, notifications_enabled, access_until)"
+    ))
+
+    result = await conn.execute(
+        select(User.id, User.is_trial, User.trial_start, User.subscription_end)
+        .where(User.access_until.is_(None))
+    )
+    rows = []
+    for user_id, is_trial, trial_start, subscription_end in result.all():
+        user = User(is_trial=is_trial, trial_start=trial_start, subscription_end=subscription_end)
+        user.refresh_access()
+        if user.access_until:
+            rows.append({"uid": user_id, "until": user.access_until})
+    if rows:
+        await conn.execute(
+            text("UPDATE users SET access_until = :until WHERE id = :uid"),
+            rows,
+        )
+        print(f"✅ Backfilled users.access_until ({len(rows)} rows)")
+
+
+async def _migrate_matched_at(conn):
+    """
+    parsed_orders.matched_at для баз, созданных до outbox.
+    Старые заказы помечаем сопоставленными — рассылать их заново не нужно.
+    """
+    columns = await conn.run_sync(
+        lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns("parsed_orders")}
+    )
+    if "matched_at" not in columns:
+        await conn.execute(text("ALTER TABLE parsed_orders ADD COLUMN matched_at TIMESTAMP"))
+        await conn.execute(text(
+            "UPDATE parsed_orders SET matched_at = COALESCE(created_at, CURRENT_TIMESTAMP)"
+        ))
+        print("✅ Backfilled parsed_orders.matched_at")
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_parsed_orders_matched_at ON parsed_orders (matched_at)"
+    ))
+
+
+async def existing_order_hashes(session: AsyncSession, hashes: Iterable[str]) -> Set[str]:
+    """Какие из хешей уже есть в parsed_orders — один запрос на пачку"""
+    hashes = list(hashes)
+    found = set()
+    for i in range(0, len(hashes), BULK_CHUNK):
+        result = await session.execute(
+            select(ParsedOrder.hash).where(ParsedOrder.hash.in_(hashes[i:i + BULK_CHUNK]))
+        )
+        found.update(result.scalars().all())
+    return found
+
+
+async def insert_parsed_orders(session: AsyncSession, rows: List[dict]) -> Set[str]:
+    """
+    Многострочная вставка в parsed_orders с ON CONFLICT DO NOTHING.
+    Возвращает хеши строк, которые вставил именно этот вызов: если тот же
+    заказ параллельно записал другой процесс, его здесь не будет.
+    """
+    return set(await insert_ignore(session, ParsedOrder, rows, [ParsedOrder.hash], ParsedOrder.hash))
+
+
+async def insert_ignore(session: AsyncSession, model, rows: List[dict],
+                        conflict_columns: list, returning=None) -> list:
+    """
+    INSERT ... ON CONFLICT (conflict_columns) DO NOTHING пачками по BULK_CHUNK
+    (SQLite и PostgreSQL). С returning — значения этой колонки у реально
+    вставленных строк, со списком колонок — кортежи их значений.
+    """
+    if not rows:
+        return []
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return await _insert_ignore_one_by_one(session, model, rows, returning)
+
+    inserted = []
+    for i in range(0, len(rows), BULK_CHUNK):
+        stmt = (
+            dialect_insert(model)
+            .values(rows[i:i + BULK_CHUNK])
+            .on_conflict_do_nothing(index_elements=conflict_columns)
+        )
+        if returning is None:
+            await session.execute(stmt)
+            continue
+        if isinstance(returning, (list, tuple)):
+            result = await session.execute(stmt.returning(*returning))
+            inserted.extend(tuple(row) for row in result.all())
+            continue
+        result = await session.execute(stmt.returning(returning))
+        inserted.extend(result.scalars().all())
+    return inserted
+
+
+async def _insert_ignore_one_by_one(session: AsyncSession, model, rows: List[dict],
+                                    returning=None) -> list:
+    """Запасной путь для СУБД без ON CONFLICT"""
+    inserted = []
+    for row in rows:
+        try:
+            async with session.begin_nested():
+                await session.execute(insert(model).values(row))
+            if isinstance(returning, (list, tuple)):
+                inserted.append(tuple(row[column.key] for column in returning))
+            elif returning is not None:
+                inserted.append(row[returning.key])
+        except IntegrityError:
+            continue
+    return inserted
+
+
 async def get_session() -> AsyncSession:
     async with async_session() as session:
         return session
@@ -5,6 +5,7 @@ from sqlalchemy import select
 from bot.database import async_session
 from bot.models import User
 from bot.config import config
+from bot.services.subscribers import subscriber_registry
 
 router = Router()
 
@@ -74,6 +75,7 @@ async def toggle_category(callback: CallbackQuery):
             cats.append(cat_key)
         user.categories = cats
         await session.commit()
+    subscriber_registry.user_changed(user)
 
     await callback.message.edit_reply_markup(
         reply_markup=categories_keyboard(cats)
@@ -93,6 +95,7 @@ async def select_all(callback: CallbackQuery):
         if user:
             user.categories = all_cats
             await session.commit()
+            subscriber_registry.user_changed(user)
 
     await callback.message.edit_reply_markup(
         reply_markup=categories_keyboard(all_cats)
@@ -110,6 +113,7 @@ async def clear_all(callback: CallbackQuery):
         if user:
             user.categories = []
             await session.commit()
+            subscriber_registry.user_changed(user)
 
     await callback.message.edit_reply_markup(
         reply_markup=categories_keyboard([])
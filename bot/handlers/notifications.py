@@ -6,6 +6,7 @@ from sqlalchemy import select
 
 from bot.database import async_session
 from bot.models import User
+from bot.services.subscribers import subscriber_registry
 
 router = Router()
 
@@ -65,6 +66,7 @@ async def toggle_notifications(callback: CallbackQuery):
         user = result.scalar_one_or_none()
         user.notifications_enabled = not user.notifications_enabled
         await session.commit()
+    subscriber_registry.user_changed(user)
 
     status = "включены" if user.notifications_enabled else "выключены"
     await callback.answer(f"Уведомления {status}!", show_alert=True)
@@ -80,6 +82,7 @@ async def toggle_instant(callback: CallbackQuery):
         user = result.scalar_one_or_none()
         user.instant_notify = not user.instant_notify
         await session.commit()
+    subscriber_registry.user_changed(user)
 
     mode = "мгновенные" if user.instant_notify else "сводкой"
     await callback.answer(f"Режим: {mode}", show_alert=True)
@@ -116,6 +119,7 @@ async def set_min_budget_save(message: Message, state: FSMContext):
         if user:
             user.min_budget = max(0, budget)
             await session.commit()
+            subscriber_registry.user_changed(user)
 
     await state.clear()
     await message.answer(
@@ -161,6 +165,7 @@ async def set_quiet(callback: CallbackQuery):
             user.quiet_hours_start = start
             user.quiet_hours_end = end
             await session.commit()
+            subscriber_registry.user_changed(user)
 
     if start == 0 and end == 0:
         await callback.answer("🔔 Тихие часы отключены!", show_alert=True)
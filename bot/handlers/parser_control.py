@@ -1,10 +1,14 @@
+from contextlib import aclosing
+
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from sqlalchemy import select
 
 from bot.database import async_session
 from bot.models import User
-from bot.parsers.manager import parser_manager
+from bot.services.render import render_order
+from bot.services.sent_log import sent_log
+from bot.services.subscribers import subscriber_registry
 from bot.config import config
 from bot.handlers.middleware import check_subscription, SUB_REQUIRED_KB, SUB_REQUIRED_TEXT
 
@@ -45,7 +49,7 @@ async def parser_control(callback: CallbackQuery):
         f"🔍 <b>Управление парсером</b>\n\n"
         f"Статус: {status}\n"
         f"Категорий выбрано: {cats}\n"
-        f"Интервал: {config.PARSE_INTERVAL} сек\n\n"
+        f"Интервал: {config.PARSE_INTERVAL_MIN}–{config.PARSE_INTERVAL_MAX} сек (по активности биржи)\n\n"
         f"{'⚠️ Выберите хотя бы одну категорию!' if cats == 0 else ''}",
         reply_markup=keyboard,
         parse_mode="HTML"
@@ -72,6 +76,7 @@ async def parser_start(callback: CallbackQuery):
 
         user.parser_active = True
         await session.commit()
+    subscriber_registry.user_changed(user)
 
     await callback.answer("🟢 Парсер запущен!", show_alert=True)
     await parser_control(callback)
@@ -86,6 +91,7 @@ async def parser_stop(callback: CallbackQuery):
         user = result.scalar_one_or_none()
         user.parser_active = False
         await session.commit()
+    subscriber_registry.user_changed(user)
 
     await callback.answer("🔴 Парсер остановлен", show_alert=True)
     await parser_control(callback)
@@ -104,51 +110,45 @@ async def parse_now(callback: CallbackQuery):
 
     await callback.answer("🔍 Ищу заказы... 10-20 секунд")
 
-    keywords = []
-    for cat in user.categories:
-        cat_info = config.CATEGORIES.get(cat)
-        if cat_info:
-            keywords.extend(cat_info["keywords"])
-
-    orders = await parser_manager.parse_all(keywords)
+    # Парсеры (lxml, пул процессов) грузим только при первом ручном поиске
+    from bot.parsers.manager import parser_manager
 
-    if not orders:
+    # Отправляем по мере ответа бирж, не дожидаясь самой медленной
+    sent = 0
+    stream = parser_manager.stream_all(list(user.categories), incremental=False)
+    async with aclosing(stream):
+        async for orders in stream:
+            fresh = [o for o in orders if not sent_log.is_sent(callback.from_user.id, o.hash)]
+            # Журнал в БД общий с воркером: занимаем заказы до отправки,
+            # иначе matcher пришлёт их этому чату ещё раз
+            claimed = await sent_log.claim(callback.from_user.id, [o.hash for o in fresh[:10 - sent]])
+            for order in fresh:
+                if sent >= 10:
+                    break
+                if order.hash not in claimed:
+                    continue
+
+                text, keyboard = render_order(order)
+                try:
+                    await callback.message.answer(
+                        text,
+                        reply_markup=keyboard,
+                        parse_mode="HTML",
+                        disable_web_page_preview=True
+                    )
+                    sent_log.remember(callback.from_user.id, order.hash)
+                    sent += 1
+                except Exception:
+                    try:
+                        await sent_log.unclaim(callback.from_user.id, order.hash)
+                    except Exception:
+                        pass
+                    continue
+            if sent >= 10:
+                break
+
+    if not sent:
         await callback.message.answer("😔 Новых заказов не найдено. Попробуйте позже.")
         return
 
-    sent = 0
-    for order in orders[:10]:
-        if parser_manager.is_sent(callback.from_user.id, order.hash):
-            continue
-
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text="✍️ Сгенерировать отклик",
-                callback_data=f"generate_response:{order.hash[:32]}"
-            )],
-            [
-                InlineKeyboardButton(
-                    text="📥 В CRM",
-                    callback_data=f"save_crm:{order.hash[:32]}"
-                ),
-                InlineKeyboardButton(
-                    text="🔍 Проверить",
-                    callback_data=f"check_client:{order.hash[:32]}"
-                ),
-            ],
-            [InlineKeyboardButton(text="🔗 Открыть", url=order.url)] if order.url else []
-        ])
-
-        try:
-            await callback.message.answer(
-                order.to_message(),
-                reply_markup=keyboard,
-                parse_mode="HTML",
-                disable_web_page_preview=True
-            )
-            parser_manager.mark_sent(callback.from_user.id, order.hash)
-            sent += 1
-        except Exception:
-            continue
-
     await callback.message.answer(f"✅ Найдено: {sent} заказов")
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from aiogram import Router, F
 from aiogram.filters import CommandStart, Command
 from aiogram.types import (
@@ -53,7 +55,10 @@ async def cmd_start(message: Message):
                 telegram_id=message.from_user.id,
                 username=message.from_user.username,
                 full_name=message.from_user.full_name,
+                is_trial=True,
+                trial_start=datetime.utcnow(),
             )
+            user.refresh_access()
             session.add(user)
             await session.commit()
 
@@ -107,8 +112,8 @@ async def back_to_menu(callback: CallbackQuery):
 
 @router.callback_query(F.data == "parser_stats")
 async def parser_stats(callback: CallbackQuery):
-    from bot.parsers.manager import parser_manager
-    stats = parser_manager.get_stats()
+    from bot.services.pipeline import parser_stats
+    stats = await parser_stats()
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="◀️ Назад", callback_data="main_menu")]
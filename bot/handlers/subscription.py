@@ -5,7 +5,7 @@ from sqlalchemy import select
 
 from bot.database import async_session
 from bot.models import User, Payment
-from bot.services.payment import payment_service
+from bot.services.subscribers import subscriber_registry
 from bot.config import config
 
 router = Router()
@@ -72,7 +72,8 @@ async def pay_subscription(callback: CallbackQuery):
             )
             user = result.scalar_one_or_none()
 
-            # Создаём платёж
+            # Создаём платёж (SDK ЮKassa импортируем только здесь)
+            from bot.services.payment import payment_service
             payment_data = await payment_service.create_payment(
                 user_id=user.id,
                 amount=config.SUBSCRIPTION_PRICE
@@ -138,13 +139,16 @@ async def check_payment(callback: CallbackQuery):
             return
 
         try:
+            from bot.services.payment import payment_service
             payment_info = await payment_service.check_payment(payment.yookassa_id)
 
             if payment_info["status"] == "succeeded":
                 payment.status = "succeeded"
                 user.is_trial = False
                 user.subscription_end = datetime.utcnow() + timedelta(days=config.SUBSCRIPTION_DAYS)
+                user.refresh_access()
                 await session.commit()
+                subscriber_registry.user_changed(user)
 
                 await callback.message.edit_text(
                     "🎉 <b>Оплата прошла успешно!</b>\n\n"
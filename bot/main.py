@@ -1,8 +1,11 @@
 import asyncio
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
 
+_import_started = time.perf_counter()
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -22,6 +25,7 @@ import uvicorn
 
 from bot.config import config
 from bot.database import init_db, async_session
+from bot.services.updates import update_queue
 
 # ============ LOAD HANDLERS ============
 logger.info("📦 Loading handlers directly...")
@@ -76,35 +80,27 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Database error: {e}")
 
-    # Scheduler
-    try:
-        from bot.services.scheduler import scheduler_service
-        scheduler_service.start(bot)
-        logger.info("✅ Scheduler started")
-    except Exception as e:
-        logger.error(f"❌ Scheduler error: {e}")
+    # Event loop lag
+    from bot.services.metrics import loop_lag_monitor
+    loop_lag_monitor.start()
 
-    # Webhook
-    if config.WEBHOOK_URL:
-        try:
-            await bot.delete_webhook(drop_pending_updates=True)
-            logger.info("🗑 Old webhook deleted")
+    # Updates from webhook are handled in background
+    update_queue.start(dp, bot)
 
-            webhook_url = f"{config.WEBHOOK_URL}/webhook"
-            await bot.set_webhook(
-                url=webhook_url,
-                drop_pending_updates=True,
-                allowed_updates=["message", "callback_query"]
-            )
-            logger.info(f"✅ Webhook set: {webhook_url}")
+    # Background stages (scraper, matcher, sender)
+    from bot.services.pipeline import start_pipeline, stop_pipeline
+    await start_pipeline(bot, config.pipeline_roles)
 
+    # Webhook ставит держатель аренды планировщика (scheduler_service),
+    # реплик веба может быть несколько — они его не сбрасывают
+    if config.WEBHOOK_URL:
+        try:
             info = await bot.get_webhook_info()
-            logger.info(f"📡 Webhook confirmed: url={info.url}")
+            logger.info(f"📡 Webhook: url={info.url or '—'}")
             if info.last_error_message:
                 logger.warning(f"⚠️ Last webhook error: {info.last_error_message}")
         except Exception as e:
-            logger.error(f"❌ Webhook error: {e}, falling back to polling")
-            asyncio.create_task(start_polling())
+            logger.error(f"❌ Webhook info error: {e}")
     else:
         asyncio.create_task(start_polling())
         logger.info("✅ Polling mode")
@@ -114,15 +110,9 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("🔴 Shutting down...")
-    try:
-        from bot.services.scheduler import scheduler_service
-        scheduler_service.stop()
-    except Exception:
-        pass
-    try:
-        await bot.delete_webhook()
-    except Exception:
-        pass
+    loop_lag_monitor.stop()
+    await update_queue.stop()
+    await stop_pipeline()
     await bot.session.close()
 
 
@@ -162,17 +152,23 @@ except Exception as e:
 # ============ ENDPOINTS ============
 @app.post("/webhook")
 async def webhook_handler(request: Request):
+    started = time.perf_counter()
     try:
         update_data = await request.json()
         logger.info(f"📨 Update received: {list(update_data.keys())}")
         from aiogram.types import Update
         update = Update.model_validate(update_data, context={"bot": bot})
-        await dp.feed_update(bot=bot, update=update)
-        return JSONResponse({"ok": True})
     except Exception as e:
         logger.error(f"❌ Webhook error: {e}")
         return JSONResponse({"ok": False, "error": str(e)})
 
+    # Отвечаем сразу, обработчики работают в фоне
+    if not update_queue.submit(update):
+        logger.warning("⚠️ Update queue is full, Telegram will retry")
+        return JSONResponse({"ok": False, "error": "busy"}, status_code=503)
+    update_queue.ack.add(time.perf_counter() - started)
+    return JSONResponse({"ok": True})
+
 
 @app.get("/health")
 async def health():
@@ -200,6 +196,100 @@ async def debug_webhook():
         return {"error": str(e)}
 
 
+@app.get("/debug/loop-lag")
+async def debug_loop_lag():
+    """Задержка event loop (растёт, если что-то блокирует webhook)"""
+    from bot.services.metrics import loop_lag_monitor
+    return loop_lag_monitor.snapshot()
+
+
+@app.get("/debug/updates")
+async def debug_updates():
+    """Очередь апдейтов webhook: глубина, отказы, задержки"""
+    return update_queue.snapshot()
+
+
+@app.get("/debug/delivery")
+async def debug_delivery():
+    """
+    Конвейер рассылки по таблицам в БД (видно, что делает воркер);
+    счётчики процесса — только если стадии работают здесь же
+    """
+    from datetime import datetime
+    from sqlalchemy import func, select
+    from bot.models import DeferredDelivery, Outbox, ParsedOrder
+    from bot.services.pipeline import running_roles
+
+    now = datetime.utcnow()
+
+    async def count(model, *where):
+        result = await session.execute(select(func.count()).select_from(model).where(*where))
+        return result.scalar()
+
+    async with async_session() as session:
+        oldest = (await session.execute(
+            select(func.min(Outbox.created_at)).where(Outbox.available_at <= now)
+        )).scalar()
+        report = {
+            "unmatched_orders": await count(ParsedOrder, ParsedOrder.matched_at.is_(None)),
+            "outbox": {
+                "ready": await count(Outbox, Outbox.available_at <= now),
+                "leased": await count(Outbox, Outbox.available_at > now),
+                "oldest_ready_age": round((now - oldest).total_seconds(), 1) if oldest else None,
+            },
+            "deferred": {
+                "due": await count(DeferredDelivery, DeferredDelivery.release_at <= now),
+                "waiting": await count(DeferredDelivery, DeferredDelivery.release_at > now),
+            },
+        }
+
+    roles = running_roles()
+    if roles & {"matcher", "sender"}:
+        from bot.services.delivery import delivery_service
+        from bot.services.outbox import order_matcher, outbox_sender
+        report["this_process"] = {
+            **delivery_service.snapshot(),
+            "outbox": outbox_sender.snapshot() if "sender" in roles else None,
+            "matched": order_matcher.matched if "matcher" in roles else None,
+        }
+    return report
+
+
+@app.get("/debug/leader")
+async def debug_leader():
+    """Какая реплика сейчас опрашивает биржи — по строке аренды в БД"""
+    from datetime import datetime
+    from sqlalchemy import select
+    from bot.models import Lease
+    from bot.services.pipeline import running_roles
+
+    now = datetime.utcnow()
+    async with async_session() as session:
+        leases = (await session.execute(select(Lease))).scalars().all()
+    report = {
+        "leases": [
+            {
+                "name": lease.name,
+                "holder": lease.holder,
+                "expires_at": lease.expires_at.isoformat(),
+                "active": lease.expires_at > now,
+            }
+            for lease in leases
+        ],
+    }
+    if "scraper" in running_roles():
+        from bot.services.leader import scheduler_lease
+        report["this_process"] = scheduler_lease.snapshot()
+    return report
+
+
+@app.get("/debug/imports")
+async def debug_imports():
+    """Что загружено в процесс (веб-роль не должна тянуть парсеры и ЮKassa)"""
+    from bot.services.metrics import import_report
+    return import_report()
+
+
 @app.get("/debug/reset-webhook")
 async def reset_webhook():
     """Ручной сброс webhook"""
@@ -260,6 +350,7 @@ async def payment_webhook(request: Request):
                 from bot.models import User, Payment
                 from sqlalchemy import select
                 from datetime import datetime, timedelta
+                from bot.services.subscribers import subscriber_registry
 
                 async with async_session() as session:
                     pay_r = await session.execute(
@@ -276,6 +367,9 @@ async def payment_webhook(request: Request):
                     if user:
                         user.is_trial = False
                         user.subscription_end = datetime.utcnow() + timedelta(days=config.SUBSCRIPTION_DAYS)
+                        user.refresh_access()
+                        await session.commit()
+                        subscriber_registry.user_changed(user)
                         try:
                             await bot.send_message(
                                 user.telegram_id,
@@ -293,6 +387,8 @@ async def payment_webhook(request: Request):
 
 
 def main():
+    from bot.services.metrics import import_report
+    logger.info(f"⏱ Imports: {import_report(_import_started)}")
     uvicorn.run(app, host="0.0.0.0", port=config.PORT, log_level="info")
 
 
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Float,
-    Text, ForeignKey, JSON, BigInteger
+    Text, ForeignKey, JSON, BigInteger, UniqueConstraint, Index
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -10,6 +10,10 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = "users"
+    # Выборка получателей рассылки — одним проходом по индексу
+    __table_args__ = (
+        Index("ix_users_eligible", "parser_active", "notifications_enabled", "access_until"),
+    )
 
     id = Column(Integer, primary_key=True)
     telegram_id = Column(BigInteger, unique=True, nullable=False, index=True)
@@ -27,6 +31,9 @@ class User(Base):
     is_trial = Column(Boolean, default=True)
     trial_start = Column(DateTime, default=datetime.utcnow)
     subscription_end = Column(DateTime, nullable=True)
+    # Доступ открыт до (max из конца пробного периода и подписки);
+    # обновляется через refresh_access() при каждом изменении полей выше
+    access_until = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
 
     # Notifications
@@ -53,6 +60,16 @@ class User(Base):
     clients = relationship("Client", back_populates="user")
     payments = relationship("Payment", back_populates="user")
 
+    def refresh_access(self):
+        """Пересчитать access_until после изменения пробного периода или подписки"""
+        ends = []
+        # is_trial=None — объект ещё не записан, default колонки (True) не применён
+        if self.is_trial is not False and self.trial_start:
+            ends.append(self.trial_start + timedelta(days=1))
+        if self.subscription_end:
+            ends.append(self.subscription_end)
+        self.access_until = max(ends) if ends else None
+
     @property
     def has_active_subscription(self) -> bool:
         now = datetime.utcnow()
@@ -165,4 +182,52 @@ class ParsedOrder(Base):
     client_name = Column(String(200), nullable=True)
     deadline = Column(String(200), nullable=True)
     hash = Column(String(64), unique=True, nullable=False, index=True)  # для дедупликации
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Когда заказ разобран по подписчикам (NULL — ждёт сопоставления)
+    matched_at = Column(DateTime, nullable=True, index=True)
+
+
+class Outbox(Base):
+    """Уведомление о заказе, ожидающее отправки в чат"""
+    __tablename__ = "outbox"
+    __table_args__ = (UniqueConstraint("chat_id", "order_hash", name="uq_outbox_chat_order"),)
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    order_hash = Column(String(64), nullable=False)
+    # Когда строку можно забрать: при захвате сдвигается на OUTBOX_LEASE
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DeferredDelivery(Base):
+    """Заказ, отложенный до конца тихих часов пользователя"""
+    __tablename__ = "deferred_deliveries"
+    __table_args__ = (UniqueConstraint("chat_id", "order_hash", name="uq_deferred_chat_order"),)
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False, index=True)
+    order_hash = Column(String(64), nullable=False)
+    release_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class DeliveryLog(Base):
+    """Какие заказы уже отправлены какому чату (переживает перезапуск)"""
+    __tablename__ = "delivery_log"
+    __table_args__ = (UniqueConstraint("chat_id", "digest", name="uq_delivery_log_chat_digest"),)
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, nullable=False)
+    digest = Column(BigInteger, nullable=False)  # первые 8 байт хеша заказа
+    sent_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class Lease(Base):
+    """Аренда роли на время (лидер планировщика): кто держит и до какого момента"""
+    __tablename__ = "leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,13 +1,45 @@
+import asyncio
 import hashlib
+import json
+import re
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Awaitable, Callable, FrozenSet, Iterable, List, Optional, Tuple
 from datetime import datetime
 
+from bot.config import config
+from bot.parsers.http import HttpClient, ResponseCache
+from bot.parsers.pool import ExtractPool
+from bot.parsers.watermark import Watermark
 
-@dataclass
+# Инкрементальный режим: неизменённые страницы пропускаются целиком.
+# Ручной поиск ("Найти заказы сейчас") выключает его, чтобы видеть всю ленту.
+incremental_mode: ContextVar[bool] = ContextVar("incremental_mode", default=True)
+
+
+_BUDGET_RE = re.compile(r"\d[\d\s]*")
+
+
+def parse_budget(budget: str) -> float:
+    """Первое число из строки бюджета: '5 000 руб.' -> 5000.0"""
+    match = _BUDGET_RE.search(budget or "")
+    if not match:
+        return 0.0
+    try:
+        return float(re.sub(r"\s", "", match.group(0)))
+    except ValueError:
+        return 0.0
+
+
+@dataclass(slots=True)
 class FreelanceOrder:
-    """Стандартная модель заказа"""
+    """
+    Стандартная модель заказа.
+    Хеш, текст для поиска и числовой бюджет считаются один раз при создании,
+    поэтому source, title, url и description после создания не меняются
+    (category — можно, она в хеш не входит).
+    """
     title: str
     description: str = ""
     budget: str = ""
@@ -19,17 +51,46 @@ class FreelanceOrder:
     deadline: str = ""
     external_id: str = ""
     created_at: datetime = field(default_factory=datetime.utcnow)
+    # Уникальный хеш для дедупликации
+    hash: str = field(init=False, repr=False, compare=False)
+    # title + description в нижнем регистре
+    search_text: str = field(init=False, repr=False, compare=False)
+    # (набор категорий, с которым считали; результат)
+    _matched: Optional[Tuple[Optional[FrozenSet[str]], FrozenSet[str]]] = field(
+        default=None, init=False, repr=False, compare=False)
 
-    @property
-    def hash(self) -> str:
-        """Уникальный хеш для дедупликации"""
-        content = f"{self.source}:{self.title}:{self.url}"
+    def __post_init__(self):
+        self.hash = self.make_hash(self.source, self.title, self.url)
+        self.search_text = f"{self.title} {self.description}".lower()
+        if not self.budget_value and self.budget:
+            self.budget_value = parse_budget(self.budget)
+
+    @staticmethod
+    def make_hash(source: str, title: str, url: str) -> str:
+        content = f"{source}:{title}:{url}"
         return hashlib.sha256(content.encode()).hexdigest()
 
-    def matches_keywords(self, keywords: List[str]) -> bool:
-        """Проверка совпадения с ключевыми словами"""
-        text = f"{self.title} {self.description}".lower()
-        return any(kw.lower() in text for kw in keywords)
+    def matched_categories(self, among: Iterable[str] = None) -> FrozenSet[str]:
+        """
+        Категории (из among, None — все), под ключевые слова которых
+        подходит заказ; для одного и того же among считается один раз.
+        """
+        among = frozenset(among) if among is not None else None
+        if self._matched is not None:
+            cached_among, matched = self._matched
+            if cached_among == among:
+                return matched
+            if cached_among is None:
+                return matched & among
+        from bot.parsers.matcher import get_matcher
+        matched = get_matcher(among).match(self.search_text)
+        self._matched = (among, matched)
+        return matched
+
+    def matches_categories(self, categories: Iterable[str]) -> bool:
+        """Подходит ли заказ хотя бы под одну из категорий"""
+        categories = frozenset(categories)
+        return self.category in categories or bool(self.matched_categories(categories))
 
     def to_message(self) -> str:
         """Форматирование для Telegram"""
@@ -68,16 +129,210 @@ class BaseParser(ABC):
     """Базовый класс парсера"""
 
     source_name: str = "unknown"
+    HEADERS: dict = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept-Language": "ru-RU,ru;q=0.9",
+    }
+
+    def __init__(self, http: HttpClient = None, pool: ExtractPool = None):
+        # Пул соединений и пул процессов общие и принадлежат ParserManager
+        self.http = http or HttpClient()
+        self.pool = pool or ExtractPool(workers=0)
+        self.cache = ResponseCache()
+        self.watermark = Watermark()
+        # Сколько циклов понадобилось идти дальше первой страницы
+        self.crawls = 0
+        self.deep_crawls = 0
+        # Новых заказов за последний запуск (до фильтра по ключевым словам)
+        self.last_new: Optional[int] = None
+        # Причина неудачи последнего запуска для circuit breaker
+        self.last_error: Optional[str] = None
+        self._categories_key: Optional[frozenset] = None
+        # Хеши, которые попадут в watermark после commit_progress()
+        self._pending_hashes: List[str] = []
+
+    async def _fetch(self, url: str, params: dict = None) -> Optional[Tuple[bytes, str]]:
+        """
+        GET-запрос через общий пул.
+        Возвращает (тело, кодировка) или None при ошибке либо если страница
+        не изменилась с прошлого цикла.
+        """
+        use_cache = incremental_mode.get()
+        key = self.cache.key(url, params)
+        headers = dict(self.HEADERS)
+        if use_cache:
+            headers.update(self.cache.conditional_headers(key))
+
+        session = await self.http.session()
+        try:
+            async with session.get(url, params=params, headers=headers) as resp:
+                if resp.status == 304:
+                    self.cache.not_modified()
+                    return None
+                if resp.status != 200:
+                    self.last_error = self.classify_status(resp.status)
+                    return None
+                body = await resp.read()
+                if use_cache and self.cache.is_unchanged(key, resp.headers, body):
+                    return None
+                return body, resp.get_encoding()
+        except asyncio.TimeoutError:
+            self.last_error = "timeout"
+            return None
+        except Exception as e:
+            print(f"[{self.source_name}] Request error: {e}")
+            self.last_error = "network"
+            return None
+
+    @staticmethod
+    def classify_status(status: int) -> str:
+        if status in (403, 429):
+            return f"http_{status}"
+        if status >= 500:
+            return "http_5xx"
+        return f"http_{status}"
+
+    async def fetch_bytes(self, url: str, params: dict = None) -> Optional[Tuple[bytes, str]]:
+        """Тело страницы и кодировка ответа или None — для разбора в lxml"""
+        return await self._fetch(url, params)
+
+    async def fetch_json(self, url: str, params: dict = None) -> Optional[dict]:
+        """Ответ JSON API или None"""
+        result = await self._fetch(url, params)
+        if result is None:
+            return None
+        try:
+            return json.loads(result[0])
+        except ValueError:
+            return None
+
+    def known_hashes(self) -> frozenset:
+        """Уже увиденные заказы (пусто при ручном поиске)"""
+        if not incremental_mode.get():
+            return frozenset()
+        return self.watermark.snapshot()
+
+    def remember(self, orders: List[FreelanceOrder]):
+        """Отметить разобранные заказы; watermark сдвинется после commit_progress()"""
+        if incremental_mode.get():
+            # Лента идёт от новых к старым — добавляем от старых к новым
+            self._pending_hashes.extend(o.hash for o in reversed(orders))
+
+    def commit_progress(self):
+        """Заказы запуска сохранены — сдвигаем watermark и кеш ответов"""
+        self.watermark.update(self._pending_hashes)
+        self._pending_hashes = []
+        self.cache.commit()
+
+    def discard_progress(self):
+        """Заказы запуска не сохранены — в следующем цикле разберём страницы заново"""
+        self._pending_hashes = []
+        self.cache.discard()
+
+    async def crawl(self, fetch_page: Callable[[int], Awaitable[Optional[Tuple[list, bool]]]],
+                    max_pages: int = 1) -> List[FreelanceOrder]:
+        """
+        Обход страниц листинга. fetch_page(n) возвращает
+        (новые заказы, встретились ли известные) или None.
+        Следующая страница берётся, только пока вся текущая состоит из
+        новых заказов — значит, между циклами их вышло больше страницы.
+        """
+        incremental = incremental_mode.get()
+        # Без watermark (холодный старт) «всё новое» ничего не значит
+        can_go_deeper = incremental and len(self.watermark) > 0
+        orders = []
+        pages = 0
+        for page in range(max_pages):
+            error = self.last_error
+            result = await fetch_page(page)
+            if page > 0:
+                # Биржу оценивает только первая страница: 404 за последней,
+                # пустая страница или отказ глубже — просто конец листинга
+                self.last_error = error
+            if result is None:
+                break
+            page_orders, reached_known = result
+            if page == 0 and not page_orders and not reached_known:
+                # Свежая страница без единой карточки — скорее всего, сменилась вёрстка
+                self.last_error = "empty"
+            orders.extend(page_orders)
+            pages += 1
+            if reached_known or not page_orders or not can_go_deeper:
+                break
+
+        if incremental:
+            self.last_new = len(orders)
+            self.crawls += 1
+            if pages > 1:
+                self.deep_crawls += 1
+        self.remember(orders)
+        return orders
+
+    async def crawl_categories(self, categories: Iterable[Optional[str]],
+                               crawl_one: Callable[[Optional[str]], Awaitable[List[FreelanceOrder]]]
+                               ) -> List[FreelanceOrder]:
+        """
+        Отдельная лента на каждую категорию, не больше CATEGORY_CONCURRENCY
+        запросов одновременно. Заказы помечаются категорией своей ленты
+        (None — общая лента без пометки), дубли между лентами отбрасываются.
+        """
+        semaphore = asyncio.Semaphore(config.CATEGORY_CONCURRENCY)
+
+        async def run(category: Optional[str]) -> List[FreelanceOrder]:
+            async with semaphore:
+                orders = await crawl_one(category)
+            if category:
+                for order in orders:
+                    order.category = category
+            return orders
+
+        results = await asyncio.gather(*(run(c) for c in categories))
+
+        merged = []
+        seen = set()
+        for orders in results:
+            for order in orders:
+                if order.hash not in seen:
+                    seen.add(order.hash)
+                    merged.append(order)
+
+        if incremental_mode.get():
+            # crawl() каждой ленты перезаписывал счётчик — считаем по всем
+            self.last_new = len(merged)
+        if merged and self.last_error == "empty":
+            # Пустая узкая категория ещё не значит, что сменилась вёрстка
+            self.last_error = None
+        return merged
+
+    @staticmethod
+    def filter_categories(orders: List[FreelanceOrder],
+                          categories: List[str] = None) -> List[FreelanceOrder]:
+        if categories is None:
+            return orders
+        return [o for o in orders if o.matches_categories(categories)]
 
     @abstractmethod
-    async def parse(self, keywords: List[str] = None) -> List[FreelanceOrder]:
-        """Парсинг заказов"""
+    async def parse(self, categories: List[str] = None) -> List[FreelanceOrder]:
+        """Парсинг заказов; categories — на что подписаны активные пользователи"""
         pass
 
-    async def safe_parse(self, keywords: List[str] = None) -> List[FreelanceOrder]:
+    async def safe_parse(self, categories: List[str] = None) -> List[FreelanceOrder]:
         """Безопасный парсинг с обработкой ошибок"""
+        # Другой набор категорий — прошлые ответы могли быть отфильтрованы
+        categories_key = frozenset(categories) if categories is not None else None
+        if incremental_mode.get():
+            # Прошлый запуск не подтвердили (не сохранили) — забываем его
+            self.discard_progress()
+            if categories_key != self._categories_key:
+                self.cache.clear()
+                self._categories_key = categories_key
+        self.last_error = None
         try:
-            return await self.parse(keywords)
+            return await self.parse(categories)
         except Exception as e:
             print(f"[{self.source_name}] Parse error: {e}")
+            self.last_error = "error"
+            if incremental_mode.get():
+                self.discard_progress()
             return []
\ No newline at end of file
@@ -0,0 +1,75 @@
+import random
+import time
+from typing import Optional
+
+from bot.config import config
+
+
+class CircuitBreaker:
+    """
+    Предохранитель одной биржи.
+    closed — работаем; open — биржа пропускается до истечения паузы;
+    half_open — пробный запрос, успех закрывает, ошибка снова открывает
+    с удвоенной паузой (exponential backoff + jitter).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # После таких ответов повторять сразу бессмысленно — открываемся с первого раза
+    IMMEDIATE = {"http_429", "http_403"}
+
+    def __init__(self, threshold: int = None, base_delay: float = None,
+                 max_delay: float = None):
+        self.threshold = threshold or config.BREAKER_THRESHOLD
+        self.base_delay = base_delay or config.BREAKER_BASE_DELAY
+        self.max_delay = max_delay or config.BREAKER_MAX_DELAY
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opens = 0              # сколько раз подряд открывались (для backoff)
+        self.last_failure: Optional[str] = None
+        self.open_until = 0.0
+
+    def allow(self) -> bool:
+        """Можно ли сейчас опрашивать биржу"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() >= self.open_until:
+            self.state = self.HALF_OPEN
+            return True
+        # open с неистёкшей паузой или пробный запрос уже идёт
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opens = 0
+
+    def record_failure(self, kind: str):
+        self.failures += 1
+        self.last_failure = kind
+        if (self.state == self.HALF_OPEN or kind in self.IMMEDIATE
+                or self.failures >= self.threshold):
+            self._open()
+
+    def cancel_probe(self):
+        """
+        Пробный запрос отменили снаружи (ручной поиск прервали, потеряли
+        лидерство) — биржа тут ни при чём: следующий allow() пробует снова.
+        """
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self.open_until = time.monotonic()
+
+    def _open(self):
+        delay = min(self.base_delay * (2 ** self.opens), self.max_delay)
+        delay *= random.uniform(0.8, 1.2)
+        self.state = self.OPEN
+        self.open_until = time.monotonic() + delay
+        self.opens += 1
+        self.failures = 0
+
+    def retry_in(self) -> int:
+        """Секунд до пробного запроса"""
+        return max(int(self.open_until - time.monotonic()), 0)
@@ -1,11 +1,14 @@
-import aiohttp
-from typing import List
+from typing import List, Optional
+from bot.config import config
 from bot.parsers.base import BaseParser, FreelanceOrder
 
 
 class HHParser(BaseParser):
     source_name = "hh"
     API_URL = "https://api.hh.ru/vacancies"
+    HEADERS = {
+        "User-Agent": "FreelanceRadarBot/1.0 (contact@example.com)",
+    }
 
     SEARCH_QUERIES = {
         "python": "python freelance",
@@ -13,44 +16,62 @@ class HHParser(BaseParser):
         "design": "дизайнер фриланс",
         "copywriting": "копирайтер удаленно",
         "mobile": "мобильный разработчик удаленно",
+        "marketing": "маркетолог удаленно",
+        "data": "аналитик данных удаленно",
+        "devops": "devops инженер удаленно",
     }
+    DEFAULT_QUERY = "фриланс"
 
-    async def parse(self, keywords: List[str] = None) -> List[FreelanceOrder]:
-        orders = []
+    async def parse(self, categories: List[str] = None) -> List[FreelanceOrder]:
+        """Отдельный поиск на каждую категорию, на которую кто-то подписан"""
+        feeds: List[Optional[str]] = [
+            c for c in sorted(set(categories or [])) if c in self.SEARCH_QUERIES
+        ]
+        if not feeds:
+            feeds = [None]
 
-        search_text = " OR ".join(keywords[:5]) if keywords else "фриланс"
+        async def crawl_one(category: Optional[str]) -> List[FreelanceOrder]:
+            search_text = self.SEARCH_QUERIES[category] if category else self.DEFAULT_QUERY
+            return await self._crawl_query(search_text)
 
-        params = {
-            "text": search_text,
-            "schedule": "remote",
-            "per_page": 20,
-            "page": 0,
-            "order_by": "publication_time",
-        }
+        return await self.crawl_categories(feeds, crawl_one)
 
-        headers = {
-            "User-Agent": "FreelanceRadarBot/1.0 (contact@example.com)",
-        }
+    async def _crawl_query(self, search_text: str) -> List[FreelanceOrder]:
+        known = self.known_hashes()
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(
-                    self.API_URL,
-                    params=params,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=15)
-                ) as resp:
-                    if resp.status != 200:
-                        return orders
-                    data = await resp.json()
-            except Exception:
-                return orders
+        async def fetch_page(page: int):
+            params = {
+                "text": search_text,
+                "schedule": "remote",
+                "per_page": 20,
+                "page": page,
+                "order_by": "publication_time",
+            }
+            data = await self.fetch_json(self.API_URL, params=params)
+            if not data:
+                return None
+            return self._extract(data, known)
 
+        return await self.crawl(fetch_page, config.PAGINATION_MAX_PAGES)
+
+    def _extract(self, data: dict, known: frozenset):
+        orders = []
+        known_run = 0
+        reached_known = False
         for item in data.get("items", []):
             try:
                 title = item.get("name", "")
                 url = item.get("alternate_url", "")
 
+                # Выдача отсортирована по дате — дальше только старые вакансии
+                if FreelanceOrder.make_hash(self.source_name, title, url) in known:
+                    reached_known = True
+                    known_run += 1
+                    if known_run >= config.WATERMARK_STOP_AFTER:
+                        break
+                    continue
+                known_run = 0
+
                 salary = item.get("salary")
                 budget = ""
                 budget_value = 0.0
@@ -92,4 +113,4 @@ class HHParser(BaseParser):
             except Exception:
                 continue
 
-        return orders
\ No newline at end of file
+        return orders, reached_known
\ No newline at end of file
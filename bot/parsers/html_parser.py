@@ -0,0 +1,37 @@
+from typing import List
+
+from bot.config import config
+from bot.parsers.base import BaseParser, FreelanceOrder
+from bot.parsers.http import HttpClient
+from bot.parsers.pool import ExtractPool
+from bot.parsers.spec import SelectorSpec, extract_orders
+
+
+class HtmlParser(BaseParser):
+    """Парсер HTML-листинга по декларативному SelectorSpec"""
+
+    def __init__(self, spec: SelectorSpec, http: HttpClient = None,
+                 pool: ExtractPool = None):
+        super().__init__(http, pool)
+        self.spec = spec
+        self.source_name = spec.source
+
+    async def parse(self, categories: List[str] = None) -> List[FreelanceOrder]:
+        orders = await self.crawl_spec(self.spec)
+        return self.filter_categories(orders, categories)
+
+    async def crawl_spec(self, spec: SelectorSpec) -> List[FreelanceOrder]:
+        """Обход одного листинга (общего или ленты категории)"""
+        known = self.known_hashes()
+
+        async def fetch_page(page: int):
+            result = await self.fetch_bytes(spec.page(page))
+            if not result:
+                return None
+            body, encoding = result
+            # Разбор — в пуле процессов, туда уходят spec, байты HTML и известные хеши
+            return await self.pool.run(
+                extract_orders, spec, body, encoding, known, config.WATERMARK_STOP_AFTER
+            )
+
+        return await self.crawl(fetch_page, spec.max_pages)
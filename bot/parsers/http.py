@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiohttp
+
+from bot.config import config
+
+
+class HttpClient:
+    """Общий пул HTTP-соединений для всех парсеров"""
+
+    def __init__(self, limit: int = None, limit_per_host: int = None,
+                 dns_ttl: int = None, timeout: int = None):
+        self.limit = limit or config.HTTP_POOL_LIMIT
+        self.limit_per_host = limit_per_host or config.HTTP_POOL_LIMIT_PER_HOST
+        self.dns_ttl = dns_ttl or config.HTTP_DNS_TTL
+        self.timeout = timeout or config.HTTP_TIMEOUT
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Ленивое создание сессии (нужен запущенный event loop)"""
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_ttl,
+                    keepalive_timeout=config.HTTP_KEEPALIVE,
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+@dataclass
+class CachedResponse:
+    etag: str = ""
+    last_modified: str = ""
+    digest: bytes = b""
+
+
+class ResponseCache:
+    """
+    Кеш валидаторов ответов одной биржи: ETag, Last-Modified и хеш тела.
+    Новые ответы сначала копятся отдельно и попадают в кеш только после
+    commit() — когда заказы страницы сохранены. Иначе страница, заказы
+    которой потерялись (ошибка БД, таймаут, сбой разбора), в следующем
+    цикле сочлась бы «без изменений».
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, CachedResponse] = {}
+        self._pending: Dict[str, CachedResponse] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        if not params:
+            return url
+        query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        return f"{url}?{query}"
+
+    def conditional_headers(self, key: str) -> dict:
+        """Заголовки условного GET, если сайт их поддерживает"""
+        entry = self._entries.get(key)
+        headers = {}
+        if entry:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def not_modified(self):
+        """Сервер ответил 304"""
+        self.hits += 1
+
+    def is_unchanged(self, key: str, headers, body: bytes) -> bool:
+        """Совпадает ли тело с прошлым; новый ответ запоминается до commit()"""
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        entry = self._entries.get(key)
+        unchanged = entry is not None and entry.digest == digest
+        self._pending[key] = CachedResponse(
+            etag=headers.get("ETag", ""),
+            last_modified=headers.get("Last-Modified", ""),
+            digest=digest,
+        )
+        if unchanged:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return unchanged
+
+    def commit(self):
+        self._entries.update(self._pending)
+        self._pending.clear()
+
+    def discard(self):
+        self._pending.clear()
+
+    def clear(self):
+        self._entries.clear()
+        self._pending.clear()
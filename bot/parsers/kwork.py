@@ -1,13 +1,13 @@
-import aiohttp
-from bs4 import BeautifulSoup
-from typing import List
-from bot.parsers.base import BaseParser, FreelanceOrder
-import re
+from dataclasses import replace
+from typing import List, Optional
 
+from bot.parsers.base import FreelanceOrder
+from bot.parsers.html_parser import HtmlParser
+from bot.parsers.sources import HTML_SOURCES
 
-class KworkParser(BaseParser):
+
+class KworkParser(HtmlParser):
     source_name = "kwork"
-    BASE_URL = "https://kwork.ru/projects"
 
     CATEGORY_MAP = {
         "python": "projects?c=41",
@@ -18,71 +18,36 @@ class KworkParser(BaseParser):
         "marketing": "projects?c=33",
     }
 
-    async def parse(self, keywords: List[str] = None) -> List[FreelanceOrder]:
-        orders = []
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                          "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept-Language": "ru-RU,ru;q=0.9",
+    def __init__(self, http=None, pool=None):
+        super().__init__(HTML_SOURCES["kwork"], http, pool)
+        # Ленты категорий — тот же листинг с другим адресом
+        self.category_specs = {
+            category: replace(
+                self.spec,
+                url=f"{self.spec.base_url}/{path}",
+                page_url=f"{self.spec.base_url}/{path}&page={{page}}",
+            )
+            for category, path in self.CATEGORY_MAP.items()
         }
 
-        async with aiohttp.ClientSession() as session:
-            # Парсим страницу проектов
-            try:
-                async with session.get(
-                    f"{self.BASE_URL}?a=1",
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=15)
-                ) as resp:
-                    if resp.status != 200:
-                        return orders
-                    html = await resp.text()
-            except Exception as e:
-                print(f"[kwork] Request error: {e}")
-                return orders
-
-        soup = BeautifulSoup(html, "lxml")
-
-        # Поиск карточек заказов
-        cards = soup.select(".card__content, .wants-card, [class*='project']")
-
-        for card in cards[:20]:
-            try:
-                title_el = card.select_one("a[class*='title'], .wants-card__header a, h3 a, .first-link")
-                if not title_el:
-                    continue
-
-                title = title_el.get_text(strip=True)
-                url = title_el.get("href", "")
-                if url and not url.startswith("http"):
-                    url = f"https://kwork.ru{url}"
-
-                desc_el = card.select_one(".wants-card__description-text, .breakword, p")
-                description = desc_el.get_text(strip=True) if desc_el else ""
-
-                price_el = card.select_one(".wants-card__price, .price, [class*='price']")
-                budget = price_el.get_text(strip=True) if price_el else ""
-                budget_value = 0.0
-                if budget:
-                    nums = re.findall(r'[\d\s]+', budget.replace(' ', ''))
-                    if nums:
-                        try:
-                            budget_value = float(nums[0].replace(' ', ''))
-                        except ValueError:
-                            pass
-
-                order = FreelanceOrder(
-                    title=title,
-                    description=description,
-                    budget=budget,
-                    budget_value=budget_value,
-                    url=url,
-                    source=self.source_name,
-                )
-
-                if keywords is None or order.matches_keywords(keywords):
-                    orders.append(order)
-            except Exception as e:
-                continue
-
-        return orders
\ No newline at end of file
+    async def parse(self, categories: List[str] = None) -> List[FreelanceOrder]:
+        """
+        Ленты только тех категорий, на которые кто-то подписан.
+        Категории без своей ленты на kwork покрываются общим листингом
+        с фильтром по ключевым словам.
+        """
+        wanted = sorted(set(categories or []))
+        feeds: List[Optional[str]] = [c for c in wanted if c in self.category_specs]
+        unmapped = [c for c in wanted if c not in self.category_specs]
+        if unmapped or not feeds:
+            feeds.append(None)
+
+        async def crawl_one(category: Optional[str]) -> List[FreelanceOrder]:
+            if category is None:
+                orders = await self.crawl_spec(self.spec)
+                # Общий листинг нужен только категориям без своей ленты
+                return self.filter_categories(orders, unmapped or categories)
+            # Лента категории уже отобрана биржей — ключевые слова не нужны
+            return await self.crawl_spec(self.category_specs[category])
+
+        return await self.crawl_categories(feeds, crawl_one)
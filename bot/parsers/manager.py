@@ -1,108 +1,189 @@
 import asyncio
-from typing import List, Dict, Set
+import time
+from typing import AsyncIterator, List, Dict, Optional
 from datetime import datetime
 
-from bot.parsers.base import FreelanceOrder
+from bot.config import config
+from bot.parsers.base import FreelanceOrder, incremental_mode
+from bot.parsers.breaker import CircuitBreaker
+from bot.parsers.http import HttpClient
+from bot.parsers.pool import ExtractPool
+from bot.parsers.html_parser import HtmlParser
+from bot.parsers.sources import HTML_SOURCES
 from bot.parsers.kwork import KworkParser
-from bot.parsers.fl_ru import FLParser
-from bot.parsers.habr_freelance import HabrFreelanceParser
 from bot.parsers.hh_ru import HHParser
 from bot.parsers.telegram_channels import TelegramChannelParser
-from bot.parsers.freelance_ru import FreelanceRuParser
-from bot.parsers.weblancer import WeblancerParser
 
 
 class ParserManager:
     """Менеджер всех парсеров"""
 
     def __init__(self):
-        self.parsers = {
-            "kwork": KworkParser(),
-            "fl": FLParser(),
-            "habr": HabrFreelanceParser(),
-            "hh": HHParser(),
-            "telegram": TelegramChannelParser(),
-            "freelance_ru": FreelanceRuParser(),
-            "weblancer": WeblancerParser(),
+        # Один пул соединений на все биржи: keep-alive, кеш DNS, лимит на хост
+        self.http = HttpClient()
+        # Разбор HTML — в отдельных процессах, чтобы не блокировать webhook
+        self.pool = ExtractPool()
+        self.parsers = {}
+        # HTML-биржи описаны данными в sources.py, своя логика — только у kwork
+        custom = {"kwork": KworkParser}
+        for name, spec in HTML_SOURCES.items():
+            if name in custom:
+                self.parsers[name] = custom[name](self.http, self.pool)
+            else:
+                self.parsers[name] = HtmlParser(spec, self.http, self.pool)
+        self.parsers["hh"] = HHParser(self.http, self.pool)
+        self.parsers["telegram"] = TelegramChannelParser(self.http, self.pool)
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker() for name in self.parsers
         }
-        # Множество хешей уже отправленных заказов для каждого пользователя
-        self._sent_hashes: Dict[int, Set[str]] = {}
         self._last_parse: Dict[str, datetime] = {}
-
-    def get_user_sent_hashes(self, user_id: int) -> Set[str]:
-        if user_id not in self._sent_hashes:
-            self._sent_hashes[user_id] = set()
-        return self._sent_hashes[user_id]
-
-    def mark_sent(self, user_id: int, order_hash: str):
-        self.get_user_sent_hashes(user_id).add(order_hash)
-        # Ограничиваем размер
-        if len(self._sent_hashes[user_id]) > 5000:
-            # Удаляем половину старых
-            hashes_list = list(self._sent_hashes[user_id])
-            self._sent_hashes[user_id] = set(hashes_list[2500:])
-
-    def is_sent(self, user_id: int, order_hash: str) -> bool:
-        return order_hash in self.get_user_sent_hashes(user_id)
-
-    async def parse_all(self, keywords: List[str] = None,
-                        sources: List[str] = None) -> List[FreelanceOrder]:
-        """Параллельный парсинг всех бирж"""
+        self._last_cycle_time: Optional[float] = None
+
+    async def close(self):
+        """Закрытие пулов соединений и процессов (при остановке приложения)"""
+        await self.http.close()
+        self.pool.close()
+
+    async def restore_watermarks(self):
+        """Восстановление watermark бирж из последних сохранённых заказов"""
+        from sqlalchemy import select
+        from bot.config import config
+        from bot.database import async_session
+        from bot.models import ParsedOrder
+
+        async with async_session() as session:
+            for name, parser in self.parsers.items():
+                result = await session.execute(
+                    select(ParsedOrder.hash)
+                    .where(ParsedOrder.source == name)
+                    .order_by(ParsedOrder.id.desc())
+                    .limit(config.WATERMARK_SIZE)
+                )
+                # От старых к новым, чтобы вытеснялись самые старые
+                parser.watermark.update(reversed(result.scalars().all()))
+
+    async def stream_all(self, categories: List[str] = None,
+                         sources: List[str] = None,
+                         incremental: bool = True) -> AsyncIterator[List[FreelanceOrder]]:
+        """
+        Заказы пачками по мере готовности каждой биржи, без ожидания
+        самой медленной. Дубли между биржами отсекаются.
+        """
         parsers_to_use = self.parsers
         if sources:
             parsers_to_use = {k: v for k, v in self.parsers.items() if k in sources}
 
-        tasks = []
-        for name, parser in parsers_to_use.items():
-            tasks.append(self._parse_single(name, parser, keywords))
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        async def run(name: str, parser):
+            return parser, await self._parse_single(name, parser, categories)
 
-        all_orders = []
-        for result in results:
-            if isinstance(result, list):
-                all_orders.extend(result)
-            elif isinstance(result, Exception):
-                print(f"Parse error: {result}")
+        started = time.perf_counter()
+        # Задачи копируют контекст при создании — режим нужно выставить до
+        token = incremental_mode.set(incremental)
+        try:
+            tasks = [
+                asyncio.create_task(run(name, parser))
+                for name, parser in parsers_to_use.items()
+            ]
+        finally:
+            incremental_mode.reset(token)
 
-        # Дедупликация
         seen_hashes = set()
-        unique_orders = []
-        for order in all_orders:
-            h = order.hash
-            if h not in seen_hashes:
-                seen_hashes.add(h)
-                unique_orders.append(order)
-
-        # Сортировка: сначала с бюджетом
-        unique_orders.sort(key=lambda o: o.budget_value or 0, reverse=True)
-
-        return unique_orders
-
-    async def _parse_single(self, name: str, parser, keywords: List[str] = None) -> List[FreelanceOrder]:
-        """Парсинг одной биржи с таймаутом"""
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    parser, result = await next_done
+                except Exception as e:
+                    print(f"Parse error: {e}")
+                    continue
+
+                batch = []
+                for order in result:
+                    h = order.hash
+                    if h not in seen_hashes:
+                        seen_hashes.add(h)
+                        batch.append(order)
+                if batch:
+                    batch.sort(key=lambda o: o.budget_value or 0, reverse=True)
+                    # Возврат из yield — потребитель обработал пачку (сохранил);
+                    # если он упал, генератор закроется здесь и прогресс не сдвинется
+                    yield batch
+                if incremental:
+                    parser.commit_progress()
+        finally:
+            # Потребитель мог прервать итерацию — не оставляем висящих задач
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            self._last_cycle_time = time.perf_counter() - started
+
+    async def _parse_single(self, name: str, parser,
+                            categories: List[str] = None) -> List[FreelanceOrder]:
+        """Парсинг одной биржи с таймаутом и circuit breaker"""
+        breaker = self.breakers[name]
+        if not breaker.allow():
+            return []
         try:
             result = await asyncio.wait_for(
-                parser.safe_parse(keywords),
-                timeout=20
+                parser.safe_parse(categories),
+                timeout=config.PARSE_TIMEOUT
             )
-            self._last_parse[name] = datetime.utcnow()
-            return result
         except asyncio.TimeoutError:
             print(f"[{name}] Timeout")
+            breaker.record_failure("timeout")
+            # Часть лент могла успеть — но их заказы не вернутся, разберём заново
+            if incremental_mode.get():
+                parser.discard_progress()
             return []
+        except BaseException:
+            # Отмена без исхода — иначе breaker навсегда останется half_open
+            breaker.cancel_probe()
+            if incremental_mode.get():
+                parser.discard_progress()
+            raise
+
+        if parser.last_error:
+            breaker.record_failure(parser.last_error)
+            if breaker.state == CircuitBreaker.OPEN:
+                print(f"[{name}] Circuit open ({parser.last_error}), retry in {breaker.retry_in()}s")
+        else:
+            breaker.record_success()
+        self._last_parse[name] = datetime.utcnow()
+        return result
 
     def get_stats(self) -> str:
         """Статистика парсеров"""
         lines = ["📊 <b>Статус парсеров:</b>\n"]
         for name, parser in self.parsers.items():
             last = self._last_parse.get(name)
-            if last:
+            breaker = self.breakers[name]
+            if breaker.state == CircuitBreaker.OPEN:
+                lines.append(
+                    f"⛔ {name.upper()} — пауза ({breaker.last_failure}), "
+                    f"повтор через {breaker.retry_in()}с"
+                )
+            elif last:
                 ago = (datetime.utcnow() - last).seconds
                 status = "🟢" if ago < 120 else "🟡" if ago < 300 else "🔴"
                 lines.append(f"{status} {name.upper()} — {ago}с назад")
             else:
                 lines.append(f"⚪ {name.upper()} — не запускался")
+
+        footer = []
+        if self._last_cycle_time is not None:
+            footer.append(f"⏱ Последний цикл: {self._last_cycle_time:.1f}с")
+        hits = sum(p.cache.hits for p in self.parsers.values())
+        total = hits + sum(p.cache.misses for p in self.parsers.values())
+        if total:
+            footer.append(f"💤 Без изменений: {hits} из {total} загрузок")
+        deep = [
+            f"{name} {p.deep_crawls}/{p.crawls}"
+            for name, p in self.parsers.items() if p.deep_crawls
+        ]
+        if deep:
+            footer.append("📚 Обход нескольких страниц: " + ", ".join(deep))
+        if footer:
+            lines.append("")
+            lines.extend(footer)
         return "\n".join(lines)
 
 
@@ -0,0 +1,101 @@
+"""
+Сопоставление заказа с категориями из config.CATEGORIES.
+
+Ключевые слова собраны в одно регулярное выражение в форме префиксного
+дерева: текст заказа просматривается один раз (в C, модуль re), результат —
+множество категорий; дальше для каждого пользователя остаётся пересечь
+его с выбранными категориями, без перебора ключевых слов. Шаблон строится
+только по категориям, на которые кто-то подписан, — при одном подписчике
+не тратим время на чужие ключевые слова.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, Optional, Pattern, Tuple
+
+from bot.config import config
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Альтернатива слов в виде дерева: в каждой позиции — одна ветка, самое длинное слово"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Ключевые слова категорий, скомпилированные в один шаблон"""
+
+    def __init__(self, categories: Dict[str, dict]):
+        owners: Dict[str, set] = {}
+        for name, info in categories.items():
+            for kw in info["keywords"]:
+                owners.setdefault(kw.lower(), set()).add(name)
+        # Найденное слово приносит и категории слов внутри него
+        # («react native» содержит «react»)
+        self.categories: Dict[str, FrozenSet[str]] = {
+            kw: frozenset().union(*(owners[other] for other in owners if other in kw))
+            for kw in owners
+        }
+        # Слова, чей хвост может начинать более длинное слово («ab» и «bc»
+        # в «abc»): после них поиск продолжается со следующего символа
+        self.overlapping: FrozenSet[str] = frozenset(
+            kw for kw in owners
+            if any(len(other) > len(kw) - i and other.startswith(kw[i:])
+                   for i in range(1, len(kw)) for other in owners)
+        )
+        self.pattern: Optional[Pattern] = re.compile(trie_pattern(owners)) if owners else None
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Категории, ключевые слова которых встречаются в тексте (уже в нижнем регистре)"""
+        if self.pattern is None:
+            return frozenset()
+        found = set()
+        search = self.pattern.search
+        found_match = search(text)
+        while found_match:
+            kw = found_match.group()
+            found.add(kw)
+            pos = found_match.start() + 1 if kw in self.overlapping else found_match.end()
+            found_match = search(text, pos)
+        if not found:
+            return frozenset()
+        return frozenset().union(*(self.categories[kw] for kw in found))
+
+
+_matchers: Dict[Optional[FrozenSet[str]], KeywordMatcher] = {}
+_matcher_key: Optional[tuple] = None
+
+
+def get_matcher(categories: Optional[FrozenSet[str]] = None) -> KeywordMatcher:
+    """
+    Общий экземпляр для набора категорий (None — все); пересобирается,
+    только если поменялись категории в конфиге.
+    """
+    global _matcher_key
+    key = tuple(
+        (name, tuple(info["keywords"])) for name, info in config.CATEGORIES.items()
+    )
+    if key != _matcher_key:
+        _matchers.clear()
+        _matcher_key = key
+    matcher = _matchers.get(categories)
+    if matcher is None:
+        if len(_matchers) > 16:
+            # Набор подписанных категорий меняется редко — старые не нужны
+            _matchers.clear()
+        selected = config.CATEGORIES if categories is None else {
+            name: info for name, info in config.CATEGORIES.items() if name in categories
+        }
+        matcher = _matchers[categories] = KeywordMatcher(selected)
+    return matcher
@@ -0,0 +1,39 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from bot.config import config
+
+
+class ExtractPool:
+    """Пул процессов для разбора HTML вне event loop"""
+
+    def __init__(self, workers: int = None):
+        self.workers = config.PARSE_WORKERS if workers is None else workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, func, *args):
+        """
+        Выполнить func(*args) в пуле.
+        Через границу процессов ходят только строки и FreelanceOrder.
+        При PARSE_WORKERS=0 разбор идёт прямо в event loop.
+        """
+        if self.workers <= 0:
+            return func(*args)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        except BrokenProcessPool:
+            # Воркер упал (OOM и т.п.) — пересоздадим пул в следующий раз
+            self._executor = None
+            return func(*args)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,81 @@
+"""
+HTML-биржи, описанные данными.
+Чтобы добавить биржу, достаточно добавить SelectorSpec в HTML_SOURCES.
+"""
+from bot.config import config
+from bot.parsers.spec import SelectorSpec, has_class, class_contains
+
+MAX_PAGES = config.PAGINATION_MAX_PAGES
+
+
+HTML_SOURCES = {
+    "kwork": SelectorSpec(
+        source="kwork",
+        url="https://kwork.ru/projects?a=1",
+        page_url="https://kwork.ru/projects?a=1&page={page}",
+        max_pages=MAX_PAGES,
+        base_url="https://kwork.ru",
+        card=f"//*[{has_class('card__content')} or {has_class('wants-card')}"
+             f" or {class_contains('project')}]",
+        title=f".//a[{class_contains('title')}]"
+              f" | .//*[{has_class('wants-card__header')}]//a"
+              f" | .//h3//a | .//*[{has_class('first-link')}]",
+        description=f".//*[{has_class('wants-card__description-text')}"
+                    f" or {has_class('breakword')}] | .//p",
+        price=f".//*[{has_class('wants-card__price')} or {has_class('price')}"
+              f" or {class_contains('price')}]",
+    ),
+    "fl": SelectorSpec(
+        source="fl",
+        url="https://www.fl.ru/projects/",
+        page_url="https://www.fl.ru/projects/page-{page}/",
+        max_pages=MAX_PAGES,
+        base_url="https://www.fl.ru",
+        card=f"//*[starts-with(@id, 'project-item') or {has_class('b-post')}"
+             f" or {has_class('b-post__grid')}]",
+        title=f".//a[{class_contains('title')}]"
+              f" | .//*[{has_class('b-post__title')}]//a | .//h2//a",
+        description=f".//*[{has_class('b-post__body')} or {has_class('b-post__txt')}]",
+        price=f".//*[{has_class('b-post__price')} or {class_contains('budget')}]",
+    ),
+    "habr": SelectorSpec(
+        source="habr",
+        url="https://freelance.habr.com/tasks",
+        page_url="https://freelance.habr.com/tasks?page={page}",
+        max_pages=MAX_PAGES,
+        base_url="https://freelance.habr.com",
+        card=f"//*[{has_class('task')} or {has_class('content-list__item')}] | //article",
+        title=f".//*[{has_class('task__title')}]//a"
+              f" | .//a[{has_class('task__title')}] | .//h2//a",
+        description=f".//*[{has_class('task__description')} or {has_class('task__text')}]",
+        price=f".//*[{has_class('task__price')} or {has_class('count')}"
+              f" or {class_contains('price')}]",
+    ),
+    "freelance_ru": SelectorSpec(
+        source="freelance_ru",
+        url="https://freelance.ru/project/search/pro",
+        page_url="https://freelance.ru/project/search/pro?page={page}",
+        max_pages=MAX_PAGES,
+        base_url="https://freelance.ru",
+        card=f"//*[{has_class('project')} or {has_class('project-item')}]"
+             f" | //*[{class_contains('project-list')}]/div",
+        title=f".//a[{has_class('project-name')}] | .//h3//a"
+              f" | .//*[{has_class('title')}]//a",
+        description=f".//*[{has_class('project-desc')} or {has_class('description')}]",
+        price=f".//*[{has_class('project-price')} or {has_class('price')}]",
+    ),
+    "weblancer": SelectorSpec(
+        source="weblancer",
+        url="https://www.weblancer.net/jobs/",
+        page_url="https://www.weblancer.net/jobs/?page={page}",
+        max_pages=MAX_PAGES,
+        base_url="https://www.weblancer.net",
+        card=f"//*[{has_class('cols_table')} and {has_class('container-fluid')}]"
+             f"//*[{has_class('row')}] | //*[{has_class('text_list')}]/div",
+        title=f".//a[{class_contains('title')}] | .//h2//a"
+              f" | .//*[{has_class('title')}]//a",
+        description=f".//*[{has_class('text_list_desc')} or {has_class('description')}]",
+        price=f".//*[{has_class('amount')} or {has_class('price')}"
+              f" or {class_contains('cost')}]",
+    ),
+}
@@ -0,0 +1,159 @@
+"""
+Декларативное описание страницы биржи и движок извлечения на lxml.
+
+Селекторы пишутся как XPath (относительно карточки заказа), один раз
+компилируются в lxml.etree.XPath и дальше применяются прямо к дереву lxml,
+без BeautifulSoup.
+
+Страница приходит байтами вместе с кодировкой из HTTP-ответа: lxml
+не принимает str с XML-объявлением кодировки (ValueError).
+"""
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from lxml import etree, html as lxml_html
+
+from bot.parsers.base import FreelanceOrder
+
+
+def has_class(name: str) -> str:
+    """Аналог CSS .name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def class_contains(part: str) -> str:
+    """Аналог CSS [class*='part']"""
+    return f"contains(@class, '{part}')"
+
+
+@dataclass(frozen=True)
+class SelectorSpec:
+    """Описание листинга заказов одной биржи"""
+    source: str
+    url: str
+    base_url: str                      # префикс для относительных ссылок
+    card: str                          # XPath карточек от корня документа
+    title: str                         # XPath элемента-ссылки с заголовком
+    link: str = "@href"                # XPath ссылки относительно заголовка
+    description: Optional[str] = None
+    price: Optional[str] = None
+    client: Optional[str] = None
+    deadline: Optional[str] = None
+    limit: int = 50                    # сколько карточек разбирать на странице
+    page_url: Optional[str] = None     # шаблон следующих страниц с {page}
+    max_pages: int = 1                 # предел глубины обхода
+
+    def page(self, index: int) -> str:
+        """URL страницы по номеру, начиная с 0"""
+        if index == 0 or not self.page_url:
+            return self.url
+        return self.page_url.format(page=index + 1)
+
+
+class CompiledSpec:
+    """SelectorSpec, скомпилированный в выражения lxml XPath"""
+
+    FIELDS = ("description", "price", "client", "deadline")
+
+    def __init__(self, spec: SelectorSpec):
+        self.spec = spec
+        self.card = etree.XPath(spec.card)
+        self.title = etree.XPath(f"({spec.title})[1]")
+        self.link = etree.XPath(f"string({spec.link})")
+        self.fields = {
+            name: etree.XPath(f"({getattr(spec, name)})[1]")
+            for name in self.FIELDS
+            if getattr(spec, name)
+        }
+
+    def _text(self, name: str, card) -> str:
+        xpath = self.fields.get(name)
+        if xpath is None:
+            return ""
+        found = xpath(card)
+        return element_text(found[0]) if found else ""
+
+    def extract(self, page: bytes, encoding: Optional[str] = None,
+                known: FrozenSet[str] = frozenset(),
+                stop_after: int = 1) -> Tuple[List[FreelanceOrder], bool]:
+        """
+        Новые заказы страницы и признак «встретились известные».
+        Известные (из known) пропускаются, после stop_after известных
+        подряд разбор прекращается.
+        """
+        if not page.strip():
+            return [], False
+        root = lxml_html.fromstring(page, parser=html_parser(encoding))
+
+        orders = []
+        known_run = 0
+        reached_known = False
+        for card in self.card(root)[:self.spec.limit]:
+            try:
+                found = self.title(card)
+                if not found:
+                    continue
+                title_el = found[0]
+
+                url = self.link(title_el)
+                if url and not url.startswith("http"):
+                    url = f"{self.spec.base_url}{url}"
+
+                title = element_text(title_el)
+                order_hash = FreelanceOrder.make_hash(self.spec.source, title, url)
+                if order_hash in known:
+                    reached_known = True
+                    known_run += 1
+                    if known_run >= stop_after:
+                        break
+                    continue
+                known_run = 0
+
+                # budget_value FreelanceOrder посчитает сам
+                orders.append(FreelanceOrder(
+                    title=title,
+                    description=self._text("description", card),
+                    budget=self._text("price", card),
+                    url=url,
+                    source=self.spec.source,
+                    client_name=self._text("client", card),
+                    deadline=self._text("deadline", card),
+                ))
+            except Exception:
+                continue
+
+        return orders, reached_known
+
+
+def element_text(el) -> str:
+    """Аналог BeautifulSoup get_text(strip=True)"""
+    return "".join(part.strip() for part in el.itertext())
+
+
+# Компилируется один раз на процесс (и в каждом воркере пула)
+_compiled: Dict[SelectorSpec, CompiledSpec] = {}
+_parsers: Dict[str, lxml_html.HTMLParser] = {}
+
+
+def html_parser(encoding: Optional[str]) -> Optional[lxml_html.HTMLParser]:
+    """Парсер с кодировкой HTTP-ответа (None — пусть lxml определит сам)"""
+    if not encoding:
+        return None
+    parser = _parsers.get(encoding)
+    if parser is None:
+        try:
+            parser = lxml_html.HTMLParser(encoding=encoding)
+        except LookupError:
+            return None
+        _parsers[encoding] = parser
+    return parser
+
+
+def extract_orders(spec: SelectorSpec, page: bytes, encoding: Optional[str] = None,
+                   known: FrozenSet[str] = frozenset(),
+                   stop_after: int = 1) -> Tuple[List[FreelanceOrder], bool]:
+    """Точка входа для пула процессов"""
+    compiled = _compiled.get(spec)
+    if compiled is None:
+        compiled = _compiled[spec] = CompiledSpec(spec)
+    return compiled.extract(page, encoding, known, stop_after)
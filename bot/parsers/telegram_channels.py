@@ -20,19 +20,18 @@ class TelegramChannelParser(BaseParser):
         "@design_freelance_ru",
     ]
 
-    def __init__(self):
+    def __init__(self, http=None, pool=None):
+        super().__init__(http, pool)
         self._buffer: List[FreelanceOrder] = []
 
     def add_order(self, order: FreelanceOrder):
         """Добавление заказа из хендлера каналов"""
         self._buffer.append(order)
 
-    async def parse(self, keywords: List[str] = None) -> List[FreelanceOrder]:
+    async def parse(self, categories: List[str] = None) -> List[FreelanceOrder]:
         """Возвращает буферизированные заказы"""
-        result = []
-        for order in self._buffer:
-            if keywords is None or order.matches_keywords(keywords):
-                result.append(order)
+        self.last_new = len(self._buffer)
+        result = self.filter_categories(list(self._buffer), categories)
 
         self._buffer.clear()
         return result
\ No newline at end of file
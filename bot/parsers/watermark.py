@@ -0,0 +1,39 @@
+from collections import deque
+from typing import Iterable
+
+from bot.config import config
+
+
+class Watermark:
+    """
+    Последние увиденные заказы одной биржи (хеши, по порядку появления).
+    Ленты отсортированы от новых к старым, поэтому разбор можно
+    останавливать, как только пошли уже известные карточки.
+    """
+
+    def __init__(self, size: int = None):
+        self.size = size or config.WATERMARK_SIZE
+        self._order: deque = deque()
+        self._known: set = set()
+
+    def __contains__(self, order_hash: str) -> bool:
+        return order_hash in self._known
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def add(self, order_hash: str):
+        if order_hash in self._known:
+            return
+        self._order.append(order_hash)
+        self._known.add(order_hash)
+        while len(self._order) > self.size:
+            self._known.discard(self._order.popleft())
+
+    def update(self, hashes: Iterable[str]):
+        for h in hashes:
+            self.add(h)
+
+    def snapshot(self) -> frozenset:
+        """Неизменяемая копия для передачи в пул процессов"""
+        return frozenset(self._known)
@@ -0,0 +1,248 @@
+"""
+Отложенная доставка: заказы, пришедшие в тихие часы пользователя,
+и заказы для сводки (instant_notify = False).
+
+Отметки пишутся в таблицу deferred_deliveries со временем выпуска
+(конец тихих часов или ближайший слот сводки). Какие чаты пора выпустить,
+решает запрос release_at <= now по индексу — он видит и строки, записанные
+другими процессами; min-heap ближайших выпусков в памяти нужен только,
+чтобы проснуться вовремя, а не ждать очередного опроса (POLL_INTERVAL).
+Когда время пришло, всё накопленное уходит пользователю сводкой через
+очередь доставки с её лимитами.
+
+Выпуск — аренда, как у outbox: release_at сдвигается на OUTBOX_LEASE,
+а строки удаляются только когда очередь доставки отчиталась о странице
+сводки. Упал процесс, пока сводка ждала в очереди, — аренда истечёт,
+и сводку выпустят заново (доставка «хотя бы один раз»).
+"""
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+
+from bot.config import config
+from bot.parsers.base import FreelanceOrder
+from bot.services.digest import digest_service
+from bot.services.subscribers import Subscriber
+
+logger = logging.getLogger(__name__)
+
+MSK_OFFSET = timedelta(hours=3)
+EPOCH = datetime(1970, 1, 1)
+POLL_INTERVAL = 60.0
+
+
+def quiet_release_at(subscriber: Subscriber, now: datetime = None) -> datetime:
+    """Ближайший конец тихих часов пользователя, UTC"""
+    now_msk = (now or datetime.utcnow()) + MSK_OFFSET
+    release = now_msk.replace(hour=subscriber.quiet_hours_end % 24, minute=0,
+                              second=0, microsecond=0)
+    if release <= now_msk:
+        release += timedelta(days=1)
+    return release - MSK_OFFSET
+
+
+def digest_release_at(subscriber: Subscriber, now: datetime = None) -> datetime:
+    """Ближайший слот сводки (кратный DIGEST_INTERVAL), UTC; в тихие часы — их конец"""
+    now = now or datetime.utcnow()
+    interval = max(config.DIGEST_INTERVAL, 1)
+    slot = (int((now - EPOCH).total_seconds()) // interval + 1) * interval
+    release = EPOCH + timedelta(seconds=slot)
+    if subscriber.is_quiet((release + MSK_OFFSET).hour):
+        return quiet_release_at(subscriber, release)
+    return release
+
+
+def order_from_row(row) -> FreelanceOrder:
+    """FreelanceOrder из строки parsed_orders"""
+    return FreelanceOrder(
+        title=row.title,
+        description=row.description or "",
+        budget=row.budget or "",
+        budget_value=row.budget_value or 0.0,
+        url=row.url or "",
+        source=row.source,
+        category=row.category or "",
+        client_name=row.client_name or "",
+        deadline=row.deadline or "",
+        external_id=row.external_id or "",
+    )
+
+
+class DeferredQueue:
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Dict[int, datetime] = {}   # ближайший выпуск по чату
+        self._acked: List[int] = []                 # доставленные строки к удалению
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def defer_row(subscriber: Subscriber, order: FreelanceOrder, now: datetime = None) -> dict:
+        """Строка deferred_deliveries до конца тихих часов — пишет вызывающий в своей транзакции"""
+        return {
+            "chat_id": subscriber.telegram_id,
+            "order_hash": order.hash,
+            "release_at": quiet_release_at(subscriber, now),
+        }
+
+    @staticmethod
+    def digest_row(subscriber: Subscriber, order: FreelanceOrder, now: datetime = None) -> dict:
+        """Строка deferred_deliveries до ближайшей сводки — пишет вызывающий в своей транзакции"""
+        return {
+            "chat_id": subscriber.telegram_id,
+            "order_hash": order.hash,
+            "release_at": digest_release_at(subscriber, now),
+        }
+
+    def track(self, rows: List[dict]):
+        """Запланировать выпуск записанных (закоммиченных) строк"""
+        for row in rows:
+            self._schedule(row["chat_id"], row["release_at"])
+
+    def _schedule(self, chat_id: int, release_at: datetime):
+        current = self._scheduled.get(chat_id)
+        if current is not None and current <= release_at:
+            return
+        self._scheduled[chat_id] = release_at
+        heapq.heappush(self._heap, (release_at, chat_id))
+
+    async def restore(self):
+        """Ближайшие выпуски из БД (при старте)"""
+        from bot.database import async_session
+        from bot.models import DeferredDelivery
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(DeferredDelivery.chat_id, func.min(DeferredDelivery.release_at))
+                .group_by(DeferredDelivery.chat_id)
+            )
+            for chat_id, release_at in result.all():
+                self._schedule(chat_id, release_at)
+        logger.info(f"[Deferred] Restored {len(self._scheduled)} chats")
+
+    async def due_chats(self, now: datetime) -> List[int]:
+        """Чаты, у которых есть строки к выпуску (по индексу release_at)"""
+        from bot.database import async_session
+        from bot.models import DeferredDelivery
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(DeferredDelivery.chat_id)
+                .where(DeferredDelivery.release_at <= now)
+                .distinct()
+            )
+            return list(result.scalars().all())
+
+    async def _loop(self):
+        try:
+            await self.restore()
+        except Exception as e:
+            logger.error(f"[Deferred] Restore error: {e}")
+
+        while True:
+            try:
+                await self.flush()
+                now = datetime.utcnow()
+                # Куча — только будильник: снимаем наступившие записи
+                while self._heap and self._heap[0][0] <= now:
+                    release_at, chat_id = heapq.heappop(self._heap)
+                    if self._scheduled.get(chat_id) == release_at:
+                        del self._scheduled[chat_id]
+                due = await self.due_chats(now)
+                if due:
+                    await self.release(due, now)
+
+                wait = POLL_INTERVAL
+                if self._heap:
+                    wait = min(wait, max((self._heap[0][0] - datetime.utcnow()).total_seconds(), 0))
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[Deferred] Release error: {e}")
+                await asyncio.sleep(POLL_INTERVAL)
+
+    def _ack(self, ids: Dict[str, int]):
+        """Колбэк страницы сводки: её строки можно удалять"""
+        def done(hashes: List[str], sent: bool):
+            # Удаляем и при окончательной ошибке: повторы уже сделала доставка
+            self._acked.extend(ids[h] for h in hashes if h in ids)
+        return done
+
+    async def release(self, chat_ids: List[int], now: datetime = None):
+        """Выдать накопленное пачкой на каждый чат"""
+        from bot.database import async_session
+        from bot.models import DeferredDelivery, ParsedOrder
+
+        now = now or datetime.utcnow()
+        async with async_session() as session:
+            # UPDATE ... RETURNING: строки получает тот, кто их захватил,
+            # поэтому две реплики не выдадут одну сводку дважды
+            result = await session.execute(
+                update(DeferredDelivery)
+                .where(DeferredDelivery.chat_id.in_(chat_ids),
+                       DeferredDelivery.release_at <= now)
+                .values(release_at=now + timedelta(seconds=config.OUTBOX_LEASE))
+                .returning(DeferredDelivery.id, DeferredDelivery.chat_id,
+                           DeferredDelivery.order_hash)
+                .execution_options(synchronize_session=False)
+            )
+            rows = sorted(result.all())
+            parsed = {}
+            if rows:
+                result = await session.execute(
+                    select(ParsedOrder)
+                    .where(ParsedOrder.hash.in_({order_hash for _, _, order_hash in rows}))
+                )
+                parsed = {row.hash: row for row in result.scalars().all()}
+            await session.commit()
+
+        by_chat: Dict[int, List[FreelanceOrder]] = defaultdict(list)
+        ids: Dict[int, Dict[str, int]] = defaultdict(dict)
+        for row_id, chat_id, order_hash in rows:
+            if order_hash in parsed:
+                by_chat[chat_id].append(order_from_row(parsed[order_hash]))
+                ids[chat_id][order_hash] = row_id
+            else:
+                # Заказ уже удалён из parsed_orders — выдавать нечего
+                self._acked.append(row_id)
+        for chat_id, orders in by_chat.items():
+            # Лимиты очереди доставки растягивают утренний всплеск
+            digest_service.send(chat_id, orders, on_done=self._ack(ids[chat_id]))
+        logger.info(f"[Deferred] Released {len(rows)} orders to {len(by_chat)} chats")
+
+    async def flush(self):
+        """Удалить строки доставленных (или окончательно отброшенных) сводок"""
+        if not self._acked:
+            return
+        from bot.database import BULK_CHUNK, async_session
+        from bot.models import DeferredDelivery
+
+        acked, self._acked = self._acked, []
+        try:
+            async with async_session() as session:
+                for i in range(0, len(acked), BULK_CHUNK):
+                    await session.execute(
+                        delete(DeferredDelivery)
+                        .where(DeferredDelivery.id.in_(acked[i:i + BULK_CHUNK]))
+                    )
+                await session.commit()
+        except Exception:
+            self._acked = acked + self._acked
+            raise
+
+
+deferred_queue = DeferredQueue()
@@ -0,0 +1,222 @@
+"""
+Очередь отправки уведомлений в Telegram.
+
+Планировщик только ставит сообщения в очередь, отправляет пул воркеров
+с учётом лимитов Telegram: общий token bucket (~30 сообщений/с на бота),
+не чаще раза в DELIVERY_CHAT_INTERVAL в один чат, пауза по RetryAfter
+и повтор с backoff при сетевых ошибках.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import update
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Не больше rate операций в секунду, всплеск до capacity"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # Под замком: ожидающие получают токены по очереди, без гонки
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+@dataclass
+class Delivery:
+    """Одно сообщение в очереди"""
+    chat_id: int
+    text: str
+    reply_markup: Any = None
+    orders: int = 0            # сколько заказов в сообщении — для orders_viewed
+    attempts: int = 0
+    on_done: Optional[Callable[[bool], None]] = None   # итог: отправлено или отброшено
+
+
+class DeliveryService:
+    def __init__(self):
+        self.bot = None
+        self.bucket = TokenBucket(config.DELIVERY_RATE)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._delayed: Set[asyncio.TimerHandle] = set()
+        self._chat_next: Dict[int, float] = {}   # когда можно писать в чат
+        self._paused_until = 0.0                  # глобальная пауза по RetryAfter
+        self._viewed: Dict[int, int] = {}
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self, bot):
+        self.bot = bot
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(config.DELIVERY_WORKERS)
+        ]
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        print(f"[Delivery] Started, {config.DELIVERY_WORKERS} workers")
+
+    def stop(self):
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+        if self._flush_task:
+            self._flush_task.cancel()
+        for handle in self._delayed:
+            handle.cancel()
+        self._delayed.clear()
+        print("[Delivery] Stopped")
+
+    def enqueue(self, chat_id: int, text: str, reply_markup=None, orders: int = 0,
+                on_done: Callable[[bool], None] = None):
+        """Поставить сообщение в очередь (не ждёт отправки)"""
+        if self._queue is None:
+            logger.warning(f"[Delivery] Not started, dropping message to {chat_id}")
+            return
+        self._queue.put_nowait(Delivery(chat_id, text, reply_markup, orders, on_done=on_done))
+
+    @staticmethod
+    def _done(item: Delivery, sent: bool):
+        if item.on_done:
+            item.on_done(sent)
+
+    def _later(self, delay: float, item: Delivery):
+        """Вернуть сообщение в очередь через delay секунд"""
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._delayed.discard(handle)
+            self._queue.put_nowait(item)
+
+        handle = loop.call_later(delay, requeue)
+        self._delayed.add(handle)
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Delivery] Error {item.chat_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, item: Delivery):
+        from aiogram.exceptions import (
+            TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+        )
+
+        now = time.monotonic()
+        wait = max(self._paused_until, self._chat_next.get(item.chat_id, 0.0)) - now
+        if wait > 0:
+            # Чат ещё «остывает» — не занимаем воркер, откладываем
+            self._later(wait, item)
+            return
+        # Слот чата занимаем до await, чтобы второй воркер его не взял
+        self._chat_next[item.chat_id] = now + config.DELIVERY_CHAT_INTERVAL
+
+        await self.bucket.acquire()
+        try:
+            await self.bot.send_message(
+                chat_id=item.chat_id,
+                text=item.text,
+                reply_markup=item.reply_markup,
+                parse_mode="HTML",
+                disable_web_page_preview=True
+            )
+        except TelegramRetryAfter as e:
+            # Flood control: Telegram сам говорит, сколько ждать
+            logger.warning(f"[Delivery] Retry after {e.retry_after}s ({item.chat_id})")
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            self.retried += 1
+            self._later(e.retry_after, item)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Бот заблокирован или сообщение некорректно — повтор не поможет
+            self.failed += 1
+            logger.warning(f"[Delivery] Dropped {item.chat_id}: {e}")
+            self._done(item, False)
+        except Exception as e:
+            item.attempts += 1
+            if item.attempts >= config.DELIVERY_MAX_ATTEMPTS:
+                self.failed += 1
+                logger.error(f"[Delivery] Gave up {item.chat_id} after {item.attempts} attempts: {e}")
+                self._done(item, False)
+                return
+            self.retried += 1
+            self._later(config.DELIVERY_RETRY_BASE * 2 ** (item.attempts - 1), item)
+        else:
+            self.sent += 1
+            if item.orders:
+                self._viewed[item.chat_id] = self._viewed.get(item.chat_id, 0) + item.orders
+            self._done(item, True)
+
+    async def _flush_loop(self):
+        """Счётчики просмотров в БД пачкой раз в несколько секунд"""
+        while True:
+            try:
+                await asyncio.sleep(10)
+                await self.flush_viewed()
+                # Забываем чаты, паузы которых давно истекли
+                now = time.monotonic()
+                self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[Delivery] Flush error: {e}")
+
+    async def flush_viewed(self):
+        if not self._viewed:
+            return
+        from bot.database import async_session
+        from bot.models import User
+
+        viewed, self._viewed = self._viewed, {}
+        async with async_session() as session:
+            for chat_id, count in viewed.items():
+                await session.execute(
+                    update(User)
+                    .where(User.telegram_id == chat_id)
+                    # updated_at не трогаем: это не смена настроек, и реестр
+                    # подписчиков не должен перечитывать каждого получателя
+                    .values(orders_viewed=User.orders_viewed + count,
+                            updated_at=User.updated_at)
+                )
+            await session.commit()
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "delayed": len(self._delayed),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "paused_for": max(round(self._paused_until - time.monotonic(), 1), 0.0),
+        }
+
+
+delivery_service = DeliveryService()
@@ -0,0 +1,82 @@
+"""
+Сводки для пользователей с instant_notify = False.
+
+Подходящие заказы копятся строками deferred_deliveries до ближайшего
+слота DIGEST_INTERVAL (см. deferred.digest_release_at) и уходят одним-
+несколькими компактными сообщениями (по DIGEST_PAGE_SIZE заказов)
+с теми же кнопками, что и у мгновенных уведомлений.
+"""
+import html
+import logging
+from typing import Callable, List, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.config import config
+from bot.parsers.base import FreelanceOrder
+from bot.services.delivery import delivery_service
+
+logger = logging.getLogger(__name__)
+
+
+def render_digest(orders: List[FreelanceOrder], page: int = 1,
+                  pages: int = 1, total: int = None) -> Tuple[str, InlineKeyboardMarkup]:
+    """Одна страница сводки: короткие строки заказов и ряд кнопок на каждый"""
+    total = total or len(orders)
+    title = f"📦 <b>Сводка: {total} новых заказов</b>"
+    if pages > 1:
+        title += f" (стр. {page}/{pages})"
+    lines = [title, ""]
+    rows = []
+    first = (page - 1) * config.DIGEST_PAGE_SIZE + 1
+    for n, order in enumerate(orders, start=first):
+        name = html.escape(order.title[:100])
+        if order.url:
+            name = f"<a href='{html.escape(order.url)}'>{name}</a>"
+        line = f"{n}. {order.source.upper()} · {name}"
+        if order.budget:
+            line += f" — 💰 {html.escape(order.budget)}"
+        lines.append(line)
+
+        short = order.hash[:32]
+        rows.append([
+            InlineKeyboardButton(text=f"✍️ {n}", callback_data=f"generate_response:{short}"),
+            InlineKeyboardButton(text=f"📥 {n}", callback_data=f"save_crm:{short}"),
+            InlineKeyboardButton(text=f"🔍 {n}", callback_data=f"check_client:{short}"),
+        ])
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+class DigestService:
+    def send(self, chat_id: int, orders: List[FreelanceOrder],
+             on_done: Callable[[List[str], bool], None] = None):
+        """
+        Поставить сводку из orders в очередь доставки постранично.
+        on_done(хеши заказов страницы, отправлено ли) — итог каждой страницы.
+        """
+        if len(orders) > config.DIGEST_MAX_ORDERS:
+            # Переполнение — вытесняем самые старые
+            dropped = len(orders) - config.DIGEST_MAX_ORDERS
+            logger.info(f"[Digest] {chat_id}: dropped {dropped} old orders")
+            if on_done:
+                on_done([o.hash for o in orders[:dropped]], False)
+            orders = orders[dropped:]
+        # Сначала дорогие, как и в мгновенной выдаче
+        orders = sorted(orders, key=lambda o: o.budget_value or 0, reverse=True)
+        size = config.DIGEST_PAGE_SIZE
+        pages = (len(orders) + size - 1) // size
+        for page in range(pages):
+            chunk = orders[page * size:(page + 1) * size]
+            text, keyboard = render_digest(chunk, page + 1, pages, len(orders))
+            delivery_service.enqueue(chat_id, text, keyboard, orders=len(chunk),
+                                     on_done=self._page_done(chunk, on_done))
+
+    @staticmethod
+    def _page_done(chunk: List[FreelanceOrder], on_done):
+        if on_done is None:
+            return None
+        hashes = [o.hash for o in chunk]
+        return lambda sent: on_done(hashes, sent)
+
+
+digest_service = DigestService()
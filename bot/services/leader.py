@@ -0,0 +1,149 @@
+"""
+Выбор лидера среди реплик через аренду строки в таблице leases.
+
+Планировщик (опрос бирж и проверка webhook) должен работать в одном
+процессе, сколько бы реплик веба ни было запущено. Лидер продлевает
+аренду каждую треть LEADER_LEASE_TTL; если он упал, аренда истекает
+и её забирает другая реплика. Работает и на SQLite, и на PostgreSQL:
+захват — условный UPDATE, который сработает только у одного.
+
+Продление ограничено по времени: лидер ждёт ответа БД не дольше остатка
+аренды минус интервал продления, иначе слагает полномочия — зависшее
+соединение не должно пережить аренду.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import or_, update
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    def __init__(self, name: str):
+        self.name = name
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self.expires_at: Optional[datetime] = None
+        self._on_elected: Optional[Callable[[], None]] = None
+        self._on_lost: Optional[Callable[[], None]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, on_elected: Callable[[], None], on_lost: Callable[[], None]):
+        self._on_elected = on_elected
+        self._on_lost = on_lost
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Остановиться и отдать аренду, чтобы другая реплика не ждала TTL"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            self._step_down()
+            try:
+                await self.release()
+            except Exception as e:
+                logger.error(f"[Leader] Release error: {e}")
+
+    async def try_acquire(self) -> bool:
+        """Взять или продлить аренду; True — этот процесс лидер"""
+        from bot.database import async_session, insert_ignore
+        from bot.models import Lease
+
+        now = datetime.utcnow()
+        until = now + timedelta(seconds=config.LEADER_LEASE_TTL)
+        async with async_session() as session:
+            await insert_ignore(session, Lease, [
+                {"name": self.name, "holder": self.holder, "expires_at": until}
+            ], [Lease.name])
+            result = await session.execute(
+                update(Lease)
+                .where(Lease.name == self.name,
+                       or_(Lease.holder == self.holder, Lease.expires_at < now))
+                .values(holder=self.holder, expires_at=until)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        if result.rowcount == 1:
+            self.expires_at = until
+            return True
+        return False
+
+    async def release(self):
+        from bot.database import async_session
+        from bot.models import Lease
+
+        async with async_session() as session:
+            await session.execute(
+                update(Lease)
+                .where(Lease.name == self.name, Lease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    def _step_up(self):
+        self.is_leader = True
+        logger.info(f"[Leader] {self.name}: elected ({self.holder})")
+        self._on_elected()
+
+    def _step_down(self):
+        self.is_leader = False
+        logger.warning(f"[Leader] {self.name}: lost ({self.holder})")
+        self._on_lost()
+
+    def _renew_timeout(self, margin: float) -> float:
+        """Сколько ждать продления: лидеру — остаток аренды минус запас"""
+        if not self.is_leader or self.expires_at is None:
+            return margin
+        return (self.expires_at - datetime.utcnow()).total_seconds() - margin
+
+    async def _loop(self):
+        interval = max(config.LEADER_LEASE_TTL / 3, 1)
+        while True:
+            try:
+                timeout = self._renew_timeout(interval)
+                if timeout <= 0:
+                    raise asyncio.TimeoutError
+                acquired = await asyncio.wait_for(self.try_acquire(), timeout=timeout)
+                if acquired and not self.is_leader:
+                    self._step_up()
+                elif not acquired and self.is_leader:
+                    self._step_down()
+            except asyncio.CancelledError:
+                break
+            except asyncio.TimeoutError:
+                logger.error(f"[Leader] {self.name}: renew timed out")
+                # Не знаем, продлилась ли аренда, — считаем, что нет
+                if self.is_leader:
+                    self._step_down()
+            except Exception as e:
+                logger.error(f"[Leader] {self.name}: renew error: {e}")
+                # БД недоступна: слагаем полномочия до истечения аренды,
+                # иначе после неё лидеров окажется двое
+                if self.is_leader and datetime.utcnow() + timedelta(seconds=interval) >= self.expires_at:
+                    self._step_down()
+            try:
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                break
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "holder": self.holder,
+            "is_leader": self.is_leader,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+
+scheduler_lease = LeaderLease("scheduler")
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Замер задержки event loop: насколько позже запланированного
+    просыпается корутина со sleep(interval).
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 240):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)  # последние ~2 минуты
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                started = time.perf_counter()
+                await asyncio.sleep(self.interval)
+                lag = time.perf_counter() - started - self.interval
+                self._samples.append(max(lag, 0.0))
+                if lag > 1.0:
+                    logger.warning(f"[Loop] Event loop lag {lag * 1000:.0f} ms")
+            except asyncio.CancelledError:
+                break
+
+    def snapshot(self) -> dict:
+        """Текущая, p99 и максимальная задержка за окно, мс"""
+        if not self._samples:
+            return {"samples": 0, "last_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self._samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "samples": len(ordered),
+            "last_ms": round(self._samples[-1] * 1000, 1),
+            "p99_ms": round(p99 * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+class LatencyWindow:
+    """Последние замеры длительности (сек) и их перцентили в мс"""
+
+    def __init__(self, window: int = 1000):
+        self._samples: deque = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def snapshot(self) -> dict:
+        if not self._samples:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self._samples)
+        p50 = ordered[len(ordered) // 2]
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "samples": len(ordered),
+            "p50_ms": round(p50 * 1000, 1),
+            "p99_ms": round(p99 * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+
+# Модули, заметные по времени импорта и памяти
+HEAVY_MODULES = ("aiogram.types", "fastapi", "uvicorn", "sqlalchemy", "lxml.html",
+                 "yookassa", "bot.parsers.manager", "bot.services.scheduler")
+
+
+def import_report(started: float = None) -> dict:
+    """Что загружено в процесс: число модулей, тяжёлые модули, пиковая память"""
+    report = {
+        "modules": len(sys.modules),
+        "heavy": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+    if started is not None:
+        report["import_ms"] = round((time.perf_counter() - started) * 1000)
+    try:
+        import resource
+        # ru_maxrss в КБ на Linux
+        report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        pass
+    return report
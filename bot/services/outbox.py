@@ -0,0 +1,296 @@
+"""
+Конвейер «биржи → подписчики → Telegram» на таблицах в БД.
+
+Стадии независимы и могут работать в разных процессах (PIPELINE_ROLES):
+- scraper (планировщик) пишет новые заказы в parsed_orders;
+- matcher забирает несопоставленные заказы, раскладывает по подписчикам
+  и в той же короткой транзакции пишет строки outbox для мгновенных
+  уведомлений и deferred_deliveries для сводок и тихих часов;
+- sender захватывает строки outbox (FOR UPDATE SKIP LOCKED на PostgreSQL,
+  на SQLite запись и так сериализована) и отдаёт их очереди доставки.
+
+Захват — это аренда: available_at сдвигается на OUTBOX_LEASE. Строка
+удаляется после отправки; если процесс упал, аренда истечёт и строку
+заберёт другой отправитель (доставка «хотя бы один раз»).
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+
+from bot.config import config
+from bot.services.deferred import deferred_queue, order_from_row
+from bot.services.render import render_order
+from bot.services.sent_log import sent_log
+from bot.services.subscribers import moscow_hour, subscriber_registry
+
+logger = logging.getLogger(__name__)
+
+
+class _Stage(ABC):
+    """Цикл стадии: работает пачками, пока есть работа, иначе ждёт wake() или опроса"""
+
+    name = "Stage"
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+            print(f"[{self.name}] Started")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+            print(f"[{self.name}] Stopped")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def wake(self):
+        """Есть новая работа (вызывает предыдущая стадия в этом же процессе)"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    @abstractmethod
+    async def run_once(self) -> int:
+        """Одна пачка работы; возвращает её размер"""
+        pass
+
+    async def _loop(self):
+        while True:
+            try:
+                self._wakeup.clear()
+                done = await self.run_once()
+                if done >= config.OUTBOX_BATCH:
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=config.OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[{self.name}] Error: {e}")
+                await asyncio.sleep(config.OUTBOX_POLL_INTERVAL)
+
+
+class OrderMatcher(_Stage):
+    name = "Matcher"
+
+    def __init__(self, sender: "OutboxSender"):
+        super().__init__()
+        self.sender = sender
+        self.matched = 0
+
+    async def _loop(self):
+        try:
+            await sent_log.restore()
+        except Exception as e:
+            logger.error(f"[Matcher] Sent log restore error: {e}")
+        await super()._loop()
+
+    async def run_once(self) -> int:
+        """Сопоставить пачку новых заказов; возвращает сколько заказов забрали"""
+        from bot.database import async_session, insert_ignore
+        from bot.models import DeferredDelivery, Outbox, ParsedOrder
+
+        if not subscriber_registry.loaded:
+            await subscriber_registry.load()
+        index = subscriber_registry.index()
+        hour = moscow_hour()
+
+        async with async_session() as session:
+            now = datetime.utcnow()
+            candidates = (
+                select(ParsedOrder.id)
+                .where(ParsedOrder.matched_at.is_(None))
+                .order_by(ParsedOrder.id)
+                .limit(config.OUTBOX_BATCH)
+                .with_for_update(skip_locked=True)
+            )
+            # Повторная проверка matched_at: параллельный matcher на SQLite
+            # мог успеть забрать те же строки
+            result = await session.execute(
+                update(ParsedOrder)
+                .where(ParsedOrder.id.in_(candidates.scalar_subquery()),
+                       ParsedOrder.matched_at.is_(None))
+                .values(matched_at=now)
+                .returning(ParsedOrder.id)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = result.scalars().all()
+            if not claimed:
+                await session.commit()
+                return 0
+            result = await session.execute(
+                select(ParsedOrder).where(ParsedOrder.id.in_(claimed)).order_by(ParsedOrder.id)
+            )
+            orders = [order_from_row(row) for row in result.scalars().all()]
+
+            planned = []
+            for order in orders:
+                for subscriber in index.recipients(order):
+                    if not sent_log.is_sent(subscriber.telegram_id, order.hash):
+                        planned.append((subscriber, order))
+            # Кольцо в памяти — лишь фильтр: ручной поиск в веб-процессе мог
+            # уже отправить заказ, поэтому шлём только тем, чья строка
+            # delivery_log вставилась сейчас
+            marks = await sent_log.claim_rows(
+                session, [(s.telegram_id, o.hash) for s, o in planned], now
+            )
+
+            outbox, deferred = [], []
+            for subscriber, order in planned:
+                chat_id = subscriber.telegram_id
+                if (chat_id, order.hash) not in marks:
+                    continue
+                if subscriber.is_quiet(hour):
+                    # Не теряем заказ — выдадим сводкой после тихих часов
+                    deferred.append(deferred_queue.defer_row(subscriber, order, now))
+                elif subscriber.instant:
+                    outbox.append({"chat_id": chat_id, "order_hash": order.hash,
+                                   "available_at": now})
+                else:
+                    deferred.append(deferred_queue.digest_row(subscriber, order, now))
+
+            # Отметка «сопоставлен», журнал отправленных, outbox и отложенные —
+            # одной транзакцией: упали до commit — заказы сопоставятся заново
+            await insert_ignore(session, Outbox, outbox, [Outbox.chat_id, Outbox.order_hash])
+            await insert_ignore(session, DeferredDelivery, deferred,
+                                [DeferredDelivery.chat_id, DeferredDelivery.order_hash])
+            await session.commit()
+
+        # Память — только после commit, иначе повтор счёл бы заказы отправленными
+        for chat_id, order_hash in marks:
+            sent_log.remember(chat_id, order_hash)
+        deferred_queue.track(deferred)
+
+        self.matched += len(orders)
+        if outbox:
+            self.sender.wake()
+        try:
+            # Чистка старых записей журнала
+            await sent_log.prune()
+        except Exception as e:
+            logger.error(f"[Matcher] Prune error: {e}")
+        return len(claimed)
+
+
+class OutboxSender(_Stage):
+    name = "Sender"
+
+    def __init__(self):
+        super().__init__()
+        self._in_flight = 0
+        self._acked: List[int] = []
+        self.claimed = 0
+        self.dropped = 0
+
+    def _ack(self, outbox_id: int):
+        def done(sent: bool):
+            # Удаляем и при окончательной ошибке: повторы уже сделала доставка
+            self._in_flight -= 1
+            self._acked.append(outbox_id)
+            self.wake()
+        return done
+
+    async def run_once(self) -> int:
+        """Удалить отправленные, захватить и поставить в очередь новую пачку"""
+        from bot.database import async_session
+        from bot.models import Outbox, ParsedOrder
+        from bot.services.delivery import delivery_service
+
+        await self.flush()
+
+        # Не набираем больше, чем очередь доставки успеет отправить за аренду
+        limit = min(config.OUTBOX_BATCH, config.OUTBOX_BATCH * 2 - self._in_flight)
+        if limit <= 0:
+            return 0
+
+        async with async_session() as session:
+            now = datetime.utcnow()
+            candidates = (
+                select(Outbox.id)
+                .where(Outbox.available_at <= now)
+                .order_by(Outbox.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            result = await session.execute(
+                update(Outbox)
+                .where(Outbox.id.in_(candidates.scalar_subquery()),
+                       Outbox.available_at <= now)
+                .values(available_at=now + timedelta(seconds=config.OUTBOX_LEASE),
+                        attempts=Outbox.attempts + 1)
+                .returning(Outbox.id, Outbox.chat_id, Outbox.order_hash, Outbox.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = result.all()
+            if not claimed:
+                await session.commit()
+                return 0
+            result = await session.execute(
+                select(ParsedOrder).where(
+                    ParsedOrder.hash.in_({row.order_hash for row in claimed})
+                )
+            )
+            orders: Dict[str, ParsedOrder] = {row.hash: row for row in result.scalars().all()}
+            await session.commit()
+
+        self.claimed += len(claimed)
+        # Один заказ обычно идёт многим чатам — рендерим его один раз
+        rendered: Dict[str, tuple] = {}
+        for outbox_id, chat_id, order_hash, attempts in claimed:
+            parsed = orders.get(order_hash)
+            if parsed is None or attempts > config.OUTBOX_MAX_ATTEMPTS:
+                # Заказ удалён или строка раз за разом не доходит до отправки
+                self.dropped += 1
+                self._acked.append(outbox_id)
+                continue
+            if order_hash not in rendered:
+                rendered[order_hash] = render_order(order_from_row(parsed))
+            text, keyboard = rendered[order_hash]
+            self._in_flight += 1
+            delivery_service.enqueue(chat_id, text, keyboard, orders=1,
+                                     on_done=self._ack(outbox_id))
+        return len(claimed)
+
+    async def flush(self):
+        """Удалить из outbox отправленные строки"""
+        if not self._acked:
+            return
+        from bot.database import BULK_CHUNK, async_session
+        from bot.models import Outbox
+
+        acked, self._acked = self._acked, []
+        try:
+            async with async_session() as session:
+                for i in range(0, len(acked), BULK_CHUNK):
+                    await session.execute(
+                        delete(Outbox).where(Outbox.id.in_(acked[i:i + BULK_CHUNK]))
+                    )
+                await session.commit()
+        except Exception:
+            self._acked = acked + self._acked
+            raise
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "acked_pending": len(self._acked),
+            "claimed": self.claimed,
+            "dropped": self.dropped,
+        }
+
+
+outbox_sender = OutboxSender()
+order_matcher = OrderMatcher(outbox_sender)
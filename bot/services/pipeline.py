@@ -0,0 +1,142 @@
+"""
+Запуск и остановка фоновых стадий (PIPELINE_ROLES) — общий код
+для совмещённого режима (bot.main) и отдельного воркера (bot.worker).
+
+Модули стадий импортируются здесь же, лениво: веб-роль без стадий
+не тянет парсеры, lxml и планировщик.
+"""
+import logging
+import sys
+from datetime import datetime
+from typing import Set
+
+logger = logging.getLogger(__name__)
+
+_started: Set[str] = set()
+
+
+def running_roles() -> Set[str]:
+    """Стадии, запущенные в этом процессе"""
+    return set(_started)
+
+
+async def start_pipeline(bot, roles: Set[str]):
+    if not roles:
+        logger.info("🧩 Pipeline roles: none")
+        return
+    logger.info(f"🧩 Pipeline roles: {', '.join(sorted(roles))}")
+
+    from bot.services.delivery import delivery_service
+    from bot.services.subscribers import subscriber_registry
+
+    # Subscribers in memory
+    try:
+        await subscriber_registry.load()
+        logger.info("✅ Subscribers loaded")
+    except Exception as e:
+        logger.error(f"❌ Subscribers error: {e}")
+    subscriber_registry.start()
+
+    # Delivery queue, digests and quiet-hours queue
+    if roles & {"matcher", "sender"}:
+        delivery_service.start(bot)
+    if "matcher" in roles:
+        from bot.services.deferred import deferred_queue
+        from bot.services.outbox import order_matcher
+        deferred_queue.start()
+        order_matcher.start()
+    if "sender" in roles:
+        from bot.services.outbox import outbox_sender
+        outbox_sender.start()
+
+    # Scheduler: работает только у реплики, держащей аренду
+    if "scraper" in roles:
+        try:
+            from bot.services.leader import scheduler_lease
+            from bot.services.scheduler import scheduler_service
+            scheduler_lease.start(
+                on_elected=lambda: scheduler_service.start(bot),
+                on_lost=scheduler_service.stop,
+            )
+            logger.info("✅ Scheduler election started")
+        except Exception as e:
+            logger.error(f"❌ Scheduler error: {e}")
+
+    _started.update(roles)
+
+
+async def stop_pipeline():
+    roles = set(_started)
+    _started.clear()
+
+    if "scraper" in roles:
+        from bot.services.leader import scheduler_lease
+        try:
+            await scheduler_lease.stop()
+        except Exception:
+            pass
+    # Парсеры могли загрузиться и без роли scraper — ручным поиском (parse_now)
+    manager = sys.modules.get("bot.parsers.manager")
+    if manager is not None:
+        try:
+            await manager.parser_manager.close()
+        except Exception:
+            pass
+    if not roles:
+        return
+
+    from bot.services.delivery import delivery_service
+    from bot.services.subscribers import subscriber_registry
+    subscriber_registry.stop()
+    if "matcher" in roles:
+        from bot.services.deferred import deferred_queue
+        from bot.services.outbox import order_matcher
+        order_matcher.stop()
+        deferred_queue.stop()
+    if "sender" in roles:
+        from bot.services.outbox import outbox_sender
+        outbox_sender.stop()
+    delivery_service.stop()
+    try:
+        await delivery_service.flush_viewed()
+        if "sender" in roles:
+            await outbox_sender.flush()
+        if "matcher" in roles:
+            await deferred_queue.flush()
+    except Exception:
+        pass
+
+
+async def parser_stats() -> str:
+    """Статус парсеров: живой, если они работают в этом процессе, иначе по заказам в БД"""
+    if "scraper" in _started:
+        from bot.parsers.manager import parser_manager
+        return parser_manager.get_stats()
+
+    from sqlalchemy import func, select
+    from bot.database import async_session
+    from bot.models import ParsedOrder
+
+    # Только последние заказы: выборка по первичному ключу, без полного скана
+    recent = (
+        select(ParsedOrder.source, ParsedOrder.created_at)
+        .order_by(ParsedOrder.id.desc())
+        .limit(1000)
+        .subquery()
+    )
+    async with async_session() as session:
+        result = await session.execute(
+            select(recent.c.source, func.max(recent.c.created_at)).group_by(recent.c.source)
+        )
+        rows = sorted(result.all())
+
+    lines = ["📊 <b>Статус парсеров:</b>",
+             "<i>парсеры работают в воркере, время — по последним сохранённым заказам</i>\n"]
+    now = datetime.utcnow()
+    for source, last in rows:
+        ago = int((now - last).total_seconds()) // 60 if last else None
+        lines.append(f"• {source.upper()} — последний заказ "
+                     + (f"{ago} мин назад" if ago is not None else "давно"))
+    if not rows:
+        lines.append("⚪ Заказов пока нет")
+    return "\n".join(lines)
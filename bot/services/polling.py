@@ -0,0 +1,63 @@
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from bot.config import config
+
+
+@dataclass
+class SourceSchedule:
+    """
+    Расписание опроса одной биржи.
+    Fixed-rate: следующий запуск считается от запланированного времени,
+    а не от окончания работы, поэтому период не «уплывает».
+    """
+    name: str
+    interval: float
+    next_run: float = 0.0
+    running: bool = False
+    rate: float = 0.0      # EWMA новых заказов в секунду
+    _base: float = 0.0     # запланированное время без jitter
+
+    ALPHA = 0.3
+
+    def start(self, now: float):
+        # Разносим первые запуски бирж по первому интервалу
+        self._base = now + random.uniform(0, self.interval)
+        self.next_run = self._base
+
+    def is_due(self, now: float) -> bool:
+        return not self.running and self.next_run <= now
+
+    def dispatch(self, now: float):
+        """Отметить запуск и запланировать следующий"""
+        self.running = True
+        self._base += self.interval
+        if self._base < now:
+            # Отстали (долгий запуск) — один запуск сразу, без «догоняния»
+            self._base = now
+        jitter = random.uniform(-config.PARSE_JITTER, config.PARSE_JITTER)
+        self.next_run = self._base + self.interval * jitter
+
+    def finish(self, new_orders: Optional[int]):
+        """
+        Подстроить интервал под наблюдаемую частоту публикаций.
+        None — биржу в этот раз не опрашивали, интервал не меняем.
+        """
+        self.running = False
+        if new_orders is None:
+            return
+        observed = new_orders / self.interval
+        self.rate = self.ALPHA * observed + (1 - self.ALPHA) * self.rate
+
+        if self.rate > 0:
+            # Целимся в ~POLL_TARGET_NEW новых заказов за опрос
+            interval = config.POLL_TARGET_NEW / self.rate
+        else:
+            interval = self.interval * 1.5
+        interval = min(max(interval, config.PARSE_INTERVAL_MIN), config.PARSE_INTERVAL_MAX)
+
+        # Новый интервал действует со следующего запуска
+        self._base += interval - self.interval
+        self.next_run += interval - self.interval
+        self.interval = interval
@@ -0,0 +1,43 @@
+"""
+Готовые сообщения о заказах: текст и клавиатура строятся один раз на заказ
+и переиспользуются для всех получателей (рассылка, «Найти заказы сейчас»).
+"""
+from collections import OrderedDict
+from typing import Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.parsers.base import FreelanceOrder
+
+RENDER_CACHE_SIZE = 2048
+
+_cache: "OrderedDict[str, Tuple[str, InlineKeyboardMarkup]]" = OrderedDict()
+
+
+def order_keyboard(order: FreelanceOrder) -> InlineKeyboardMarkup:
+    short = order.hash[:32]
+    rows = [
+        [InlineKeyboardButton(
+            text="✍️ Сгенерировать отклик",
+            callback_data=f"generate_response:{short}"
+        )],
+        [
+            InlineKeyboardButton(text="📥 В CRM", callback_data=f"save_crm:{short}"),
+            InlineKeyboardButton(text="🔍 Проверить", callback_data=f"check_client:{short}"),
+        ],
+    ]
+    if order.url:
+        rows.append([InlineKeyboardButton(text="🔗 Открыть", url=order.url)])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def render_order(order: FreelanceOrder) -> Tuple[str, InlineKeyboardMarkup]:
+    """(HTML-текст, клавиатура) заказа; LRU по хешу заказа"""
+    cached = _cache.get(order.hash)
+    if cached is not None:
+        _cache.move_to_end(order.hash)
+        return cached
+    cached = _cache[order.hash] = (order.to_message(), order_keyboard(order))
+    if len(_cache) > RENDER_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return cached
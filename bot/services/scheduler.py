@@ -1,13 +1,16 @@
 import asyncio
 import logging
+from contextlib import aclosing
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, List
 
-from sqlalchemy import select
-from bot.database import async_session
-from bot.models import User, ParsedOrder
+from bot.database import async_session, existing_order_hashes, insert_parsed_orders
+from bot.parsers.base import FreelanceOrder
 from bot.parsers.manager import parser_manager
 from bot.config import config
+from bot.services.outbox import order_matcher
+from bot.services.polling import SourceSchedule
+from bot.services.subscribers import subscriber_registry
 
 if TYPE_CHECKING:
     from aiogram import Bot
@@ -21,6 +24,9 @@ class SchedulerService:
         self.running = False
         self._parse_task = None
         self._health_task = None
+        self.schedules: Dict[str, SourceSchedule] = {}
+        self._runs = set()
+        self._wakeup = asyncio.Event()
 
     def start(self, bot):
         self.bot = bot
@@ -35,18 +41,24 @@ class SchedulerService:
             self._parse_task.cancel()
         if self._health_task:
             self._health_task.cancel()
+        for task in list(self._runs):
+            task.cancel()
         print("[Scheduler] Stopped")
 
     async def _health_loop(self):
-        """Проверка webhook каждые 5 минут"""
+        """
+        Webhook ставит и чинит только держатель аренды: сразу после избрания
+        и дальше каждые 5 минут. Реплики веба его не трогают.
+        """
         while self.running:
             try:
-                await asyncio.sleep(300)  # 5 минут
                 await self._check_webhook()
+                await asyncio.sleep(300)  # 5 минут
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"[Health] Error: {e}")
+                await asyncio.sleep(300)
 
     async def _check_webhook(self):
         """Проверка и восстановление webhook"""
@@ -89,143 +101,110 @@ class SchedulerService:
             logger.error(f"[Health] Check failed: {e}")
 
     async def _parse_loop(self):
-        """Основной цикл парсинга"""
+        """
+        Основной цикл: у каждой биржи свой таймер (fixed-rate + jitter),
+        интервал подстраивается под частоту новых заказов на бирже.
+        """
+        try:
+            await parser_manager.restore_watermarks()
+        except Exception as e:
+            logger.error(f"[Scheduler] Watermark restore error: {e}")
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for name in parser_manager.parsers:
+            schedule = SourceSchedule(name=name, interval=config.PARSE_INTERVAL)
+            schedule.start(now)
+            self.schedules[name] = schedule
+
         while self.running:
             try:
-                await asyncio.sleep(config.PARSE_INTERVAL)
-                await self._parse_and_notify()
+                now = loop.time()
+                due = [s for s in self.schedules.values() if s.is_due(now)]
+                if due:
+                    for schedule in due:
+                        schedule.dispatch(now)
+                    # Биржи, пришедшие одновременно, опрашиваются одним пакетом
+                    task = asyncio.create_task(self._run_sources(due))
+                    self._runs.add(task)
+                    task.add_done_callback(self._runs.discard)
+
+                self._wakeup.clear()
+                waiting = [s.next_run for s in self.schedules.values() if not s.running]
+                timeout = max(min(waiting) - loop.time(), 0) if waiting else config.PARSE_INTERVAL
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"[Scheduler] Parse error: {e}")
 
-    async def _parse_and_notify(self):
+    async def _run_sources(self, schedules: List[SourceSchedule]):
+        """Один запуск пакета бирж; повторный запуск той же биржи не начнётся до конца этого"""
+        for schedule in schedules:
+            parser = parser_manager.parsers.get(schedule.name)
+            if parser:
+                parser.last_new = None
+        try:
+            await self._parse_and_notify([s.name for s in schedules])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[Scheduler] Parse error: {e}")
+        finally:
+            for schedule in schedules:
+                parser = parser_manager.parsers.get(schedule.name)
+                schedule.finish(parser.last_new if parser else None)
+            # Будим цикл: закончившиеся биржи снова участвуют в расчёте сна
+            self._wakeup.set()
+
+    async def _parse_and_notify(self, sources: List[str] = None):
         """Парсинг и рассылка"""
-        async with async_session() as session:
-            result = await session.execute(
-                select(User).where(
-                    User.parser_active == True,
-                    User.notifications_enabled == True
-                )
-            )
-            users = result.scalars().all()
-
-        if not users:
-            return
-
-        # Фильтруем только с активной подпиской
-        active_users = [u for u in users if u.has_active_subscription]
-        if not active_users:
-            return
-
-        # Собираем ключевые слова
-        all_keywords = set()
-        for user in active_users:
-            if user.categories:
-                for cat in user.categories:
-                    cat_info = config.CATEGORIES.get(cat)
-                    if cat_info:
-                        all_keywords.update(cat_info["keywords"])
-
-        if not all_keywords:
-            return
-
-        # Парсим
-        orders = await parser_manager.parse_all(list(all_keywords))
-        if not orders:
+        # Получатели — из памяти, без запроса к users на каждый цикл
+        if not subscriber_registry.loaded:
+            await subscriber_registry.load()
+        index = subscriber_registry.index()
+        if not index.categories:
             return
 
-        # Рассылаем
+        # Парсим и рассылаем по мере готовности каждой биржи,
+        # не дожидаясь самой медленной
+        # Ошибка записи закрывает поток сразу: watermark и кеш страниц
+        # сдвигаются только после сохранённой пачки
+        stream = parser_manager.stream_all(sorted(index.categories), sources=sources)
+        async with aclosing(stream):
+            async for orders in stream:
+                await self._store(orders)
+
+    async def _store(self, orders: List[FreelanceOrder]):
+        """Сохранение новых заказов; по подписчикам их раскладывает matcher"""
+        # Дедупликация и запись пачкой: один SELECT ... IN и один INSERT
         async with async_session() as session:
-            for order in orders:
-                # Дедупликация
-                existing = await session.execute(
-                    select(ParsedOrder).where(ParsedOrder.hash == order.hash)
-                )
-                if existing.scalar_one_or_none():
-                    continue
-
-                parsed = ParsedOrder(
-                    external_id=order.external_id,
-                    source=order.source,
-                    title=order.title,
-                    description=order.description,
-                    budget=order.budget,
-                    budget_value=order.budget_value,
-                    url=order.url,
-                    category=order.category,
-                    client_name=order.client_name,
-                    deadline=order.deadline,
-                    hash=order.hash,
-                )
-                session.add(parsed)
-
-                for user in active_users:
-                    if parser_manager.is_sent(user.telegram_id, order.hash):
-                        continue
-
-                    # Проверяем категории
-                    if user.categories:
-                        user_keywords = []
-                        for cat in user.categories:
-                            cat_info = config.CATEGORIES.get(cat)
-                            if cat_info:
-                                user_keywords.extend(cat_info["keywords"])
-                        if not order.matches_keywords(user_keywords):
-                            continue
-
-                    # Мин. бюджет
-                    if user.min_budget > 0 and order.budget_value > 0:
-                        if order.budget_value < user.min_budget:
-                            continue
-
-                    # Тихие часы
-                    now = datetime.utcnow()
-                    hour = (now.hour + 3) % 24
-                    if user.quiet_hours_start > user.quiet_hours_end:
-                        if hour >= user.quiet_hours_start or hour < user.quiet_hours_end:
-                            continue
-                    elif user.quiet_hours_start < user.quiet_hours_end:
-                        if user.quiet_hours_start <= hour < user.quiet_hours_end:
-                            continue
-
-                    try:
-                        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-
-                        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(
-                                text="✍️ Сгенерировать отклик",
-                                callback_data=f"generate_response:{order.hash[:32]}"
-                            )],
-                            [
-                                InlineKeyboardButton(
-                                    text="📥 В CRM",
-                                    callback_data=f"save_crm:{order.hash[:32]}"
-                                ),
-                                InlineKeyboardButton(
-                                    text="🔍 Проверить",
-                                    callback_data=f"check_client:{order.hash[:32]}"
-                                ),
-                            ],
-                            [InlineKeyboardButton(
-                                text="🔗 Открыть", url=order.url
-                            )] if order.url else []
-                        ])
-
-                        await self.bot.send_message(
-                            chat_id=user.telegram_id,
-                            text=order.to_message(),
-                            reply_markup=keyboard,
-                            parse_mode="HTML",
-                            disable_web_page_preview=True
-                        )
-                        parser_manager.mark_sent(user.telegram_id, order.hash)
-                        user.orders_viewed += 1
-
-                    except Exception as e:
-                        logger.error(f"[Notify] Error {user.telegram_id}: {e}")
-
+            known = await existing_order_hashes(session, (o.hash for o in orders))
+            fresh = [o for o in orders if o.hash not in known]
+            inserted = await insert_parsed_orders(session, [
+                {
+                    "external_id": order.external_id,
+                    "source": order.source,
+                    "title": order.title,
+                    "description": order.description,
+                    "budget": order.budget,
+                    "budget_value": order.budget_value,
+                    "url": order.url,
+                    "category": order.category,
+                    "client_name": order.client_name,
+                    "deadline": order.deadline,
+                    "hash": order.hash,
+                    "created_at": order.created_at,
+                }
+                for order in fresh
+            ])
             await session.commit()
 
+        if inserted:
+            order_matcher.wake()
+
 
 scheduler_service = SchedulerService()
@@ -0,0 +1,166 @@
+"""
+Журнал отправленных заказов: кому какой заказ уже ушёл.
+
+Источник правды — таблица delivery_log с уникальным (чат, дайджест):
+заказ отправляет тот, чья вставка строки прошла (claim_rows/claim).
+Так matcher воркера и ручной поиск в веб-процессе не шлют друг за другом
+один и тот же заказ.
+
+В памяти на каждый чат — кольцо последних SENT_CACHE_SIZE восьмибайтных
+дайджестов (8 байт на заказ вместо строки из 64 hex-символов в set):
+быстрый фильтр, чтобы не ходить в БД за заведомо отправленным. После
+перезапуска кольца восстанавливаются из БД.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import delete, select
+
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 8
+
+
+def order_digest(order_hash: str) -> bytes:
+    """Первые 8 байт sha256-хеша заказа"""
+    return bytes.fromhex(order_hash[:DIGEST_SIZE * 2])
+
+
+class SentRing:
+    """Кольцевой буфер дайджестов одного чата, вытесняются самые старые"""
+
+    __slots__ = ("buf", "pos", "capacity")
+
+    def __init__(self, size: int):
+        self.buf = bytearray()
+        self.pos = 0
+        self.capacity = size * DIGEST_SIZE
+
+    def __contains__(self, digest: bytes) -> bool:
+        # Поиск подстроки идёт в C; совпадение засчитываем только по границе записи
+        i = self.buf.find(digest)
+        while i != -1:
+            if i % DIGEST_SIZE == 0:
+                return True
+            i = self.buf.find(digest, i + 1)
+        return False
+
+    def add(self, digest: bytes):
+        if len(self.buf) < self.capacity:
+            self.buf += digest
+            return
+        self.buf[self.pos:self.pos + DIGEST_SIZE] = digest
+        self.pos = (self.pos + DIGEST_SIZE) % self.capacity
+
+
+class SentLog:
+    def __init__(self, size: int = None):
+        self.size = size or config.SENT_CACHE_SIZE
+        self._rings: Dict[int, SentRing] = {}
+        self._last_prune = 0.0
+
+    def _ring(self, chat_id: int) -> SentRing:
+        ring = self._rings.get(chat_id)
+        if ring is None:
+            ring = self._rings[chat_id] = SentRing(self.size)
+        return ring
+
+    def is_sent(self, chat_id: int, order_hash: str) -> bool:
+        ring = self._rings.get(chat_id)
+        return ring is not None and order_digest(order_hash) in ring
+
+    def remember(self, chat_id: int, order_hash: str):
+        """Отметка только в памяти — строку delivery_log вставил claim"""
+        self._ring(chat_id).add(order_digest(order_hash))
+
+    @staticmethod
+    def log_rows(marks: List[Tuple[int, str]], sent_at: datetime = None) -> List[dict]:
+        """Строки delivery_log для (чат, хеш заказа) — для записи в чужой транзакции"""
+        sent_at = sent_at or datetime.utcnow()
+        return [
+            {
+                "chat_id": chat_id,
+                "digest": int.from_bytes(order_digest(order_hash), "big", signed=True),
+                "sent_at": sent_at,
+            }
+            for chat_id, order_hash in marks
+        ]
+
+    async def claim_rows(self, session, marks: List[Tuple[int, str]],
+                         sent_at: datetime = None) -> Set[Tuple[int, str]]:
+        """
+        Вставить строки delivery_log в транзакции вызывающего; возвращает
+        (чат, хеш), чьи строки вставились — только им заказ и отправлять.
+        """
+        from bot.database import insert_ignore
+        from bot.models import DeliveryLog
+
+        inserted = set(await insert_ignore(
+            session, DeliveryLog, self.log_rows(marks, sent_at),
+            [DeliveryLog.chat_id, DeliveryLog.digest],
+            [DeliveryLog.chat_id, DeliveryLog.digest],
+        ))
+        return {
+            (chat_id, order_hash) for chat_id, order_hash in marks
+            if (chat_id, int.from_bytes(order_digest(order_hash), "big", signed=True)) in inserted
+        }
+
+    async def claim(self, chat_id: int, hashes: Iterable[str]) -> Set[str]:
+        """Занять заказы для отправки в чат своей транзакцией (ручной поиск)"""
+        from bot.database import async_session
+
+        async with async_session() as session:
+            claimed = await self.claim_rows(session, [(chat_id, h) for h in hashes])
+            await session.commit()
+        return {order_hash for _, order_hash in claimed}
+
+    async def unclaim(self, chat_id: int, order_hash: str):
+        """Отправить не удалось — снять отметку, чтобы заказ ушёл позже"""
+        from bot.database import async_session
+        from bot.models import DeliveryLog
+
+        digest = int.from_bytes(order_digest(order_hash), "big", signed=True)
+        async with async_session() as session:
+            await session.execute(
+                delete(DeliveryLog).where(DeliveryLog.chat_id == chat_id,
+                                          DeliveryLog.digest == digest)
+            )
+            await session.commit()
+
+    async def prune(self):
+        """Раз в час удаляем записи старше DELIVERY_LOG_DAYS"""
+        if time.monotonic() - self._last_prune < 3600:
+            return
+        self._last_prune = time.monotonic()
+        from bot.database import async_session
+        from bot.models import DeliveryLog
+
+        cutoff = datetime.utcnow() - timedelta(days=config.DELIVERY_LOG_DAYS)
+        async with async_session() as session:
+            await session.execute(delete(DeliveryLog).where(DeliveryLog.sent_at < cutoff))
+            await session.commit()
+
+    async def restore(self):
+        """Заполнить кольца из БД (при старте), от старых отметок к новым"""
+        from bot.database import async_session
+        from bot.models import DeliveryLog
+
+        cutoff = datetime.utcnow() - timedelta(days=config.DELIVERY_LOG_DAYS)
+        async with async_session() as session:
+            result = await session.stream(
+                select(DeliveryLog.chat_id, DeliveryLog.digest)
+                .where(DeliveryLog.sent_at >= cutoff)
+                .order_by(DeliveryLog.id)
+            )
+            count = 0
+            async for chat_id, digest in result:
+                self._ring(chat_id).add(digest.to_bytes(DIGEST_SIZE, "big", signed=True))
+                count += 1
+        logger.info(f"[SentLog] Restored {count} entries for {len(self._rings)} chats")
+
+
+sent_log = SentLog()
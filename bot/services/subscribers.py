@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bot.config import config
+from bot.parsers.base import FreelanceOrder
+
+logger = logging.getLogger(__name__)
+
+
+def moscow_hour(now: datetime = None) -> int:
+    """Текущий час по МСК (тихие часы задаются в МСК)"""
+    now = now or datetime.utcnow()
+    return (now.hour + 3) % 24
+
+
+@dataclass(frozen=True)
+class Subscriber:
+    """То, что нужно рассылке от пользователя, без ORM-объекта"""
+    telegram_id: int
+    min_budget: int = 0
+    quiet_hours_start: int = 23
+    quiet_hours_end: int = 8
+    instant: bool = True       # False — заказы приходят сводкой
+
+    @classmethod
+    def from_user(cls, user) -> "Subscriber":
+        return cls(
+            telegram_id=user.telegram_id,
+            min_budget=user.min_budget or 0,
+            quiet_hours_start=user.quiet_hours_start or 0,
+            quiet_hours_end=user.quiet_hours_end or 0,
+            instant=user.instant_notify is not False,
+        )
+
+    def is_quiet(self, hour: int) -> bool:
+        start, end = self.quiet_hours_start, self.quiet_hours_end
+        if start > end:
+            return hour >= start or hour < end
+        if start < end:
+            return start <= hour < end
+        return False
+
+    def accepts_budget(self, budget_value: float) -> bool:
+        # Заказы без указанного бюджета не отсекаем
+        return not (self.min_budget > 0 and budget_value > 0
+                    and budget_value < self.min_budget)
+
+
+class SubscriberIndex:
+    """
+    Обратный индекс категория -> подписчики.
+    Рассылка заказа затрагивает только подписчиков его категорий,
+    а не всех активных пользователей.
+    """
+
+    def __init__(self):
+        self.by_category: Dict[str, List[Subscriber]] = defaultdict(list)
+        # Пользователи без выбранных категорий получают всё
+        self.everything: List[Subscriber] = []
+
+    @classmethod
+    def build(cls, users: Iterable) -> "SubscriberIndex":
+        index = cls()
+        for user in users:
+            index.add(Subscriber.from_user(user), user.categories)
+        return index
+
+    def add(self, subscriber: Subscriber, categories: Iterable[str] = None):
+        if not categories:
+            self.everything.append(subscriber)
+            return
+        for category in categories:
+            if category in config.CATEGORIES:
+                self.by_category[category].append(subscriber)
+
+    @property
+    def categories(self) -> Set[str]:
+        """Категории, на которые есть хотя бы один подписчик"""
+        return {c for c, subs in self.by_category.items() if subs}
+
+    def __len__(self) -> int:
+        ids = {s.telegram_id for subs in self.by_category.values() for s in subs}
+        return len(ids) + len(self.everything)
+
+    def recipients(self, order: FreelanceOrder) -> List[Subscriber]:
+        """
+        Кому отправить заказ: подписчики его категорий с подходящим бюджетом.
+        Тихие часы проверяет вызывающий — такие заказы откладываются.
+        """
+        categories = set(order.matched_categories(self.categories))
+        if order.category:
+            categories.add(order.category)
+
+        found: Dict[int, Subscriber] = {}
+        for category in categories:
+            for subscriber in self.by_category.get(category, ()):
+                found.setdefault(subscriber.telegram_id, subscriber)
+        for subscriber in self.everything:
+            found.setdefault(subscriber.telegram_id, subscriber)
+
+        return [s for s in found.values() if s.accepts_budget(order.budget_value)]
+
+
+class SubscriberRegistry:
+    """
+    Получатели рассылки в памяти процесса.
+    Загружается из БД при старте, дальше обновляется событиями из мест,
+    где меняются настройки пользователя (user_changed), и раз в
+    SUBSCRIBER_RECONCILE_INTERVAL сверяется с БД на случай пропущенных.
+    Изменения, сделанные другим процессом (веб-роль при отдельном воркере),
+    подхватываются по users.updated_at раз в SUBSCRIBER_POLL_INTERVAL.
+    """
+
+    def __init__(self):
+        # telegram_id -> (подписчик, категории, доступ до)
+        self._entries: Dict[int, Tuple[Subscriber, Tuple[str, ...], datetime]] = {}
+        self._index: Optional[SubscriberIndex] = None
+        self._index_valid_until: Optional[datetime] = None
+        # События, пришедшие во время загрузки, применяются поверх неё
+        self._loading = False
+        self._changed_during_load: Dict[int, Optional[tuple]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loaded_at = 0.0
+        self._polled_at: Optional[datetime] = None
+        self.loaded = False
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def _entry(user) -> Optional[tuple]:
+        if not (user.parser_active and user.notifications_enabled and user.access_until):
+            return None
+        return Subscriber.from_user(user), tuple(user.categories or ()), user.access_until
+
+    def _apply(self, telegram_id: int, entry: Optional[tuple]):
+        if entry is None:
+            self._entries.pop(telegram_id, None)
+        else:
+            self._entries[telegram_id] = entry
+        self._index = None
+
+    def user_changed(self, user):
+        """Вызывать после commit изменений, влияющих на рассылку"""
+        entry = self._entry(user)
+        if self._loading:
+            self._changed_during_load[user.telegram_id] = entry
+        self._apply(user.telegram_id, entry)
+
+    async def load(self):
+        """Полная загрузка (старт и периодическая сверка)"""
+        from sqlalchemy import select
+        from bot.database import async_session
+        from bot.models import User
+
+        self._loading = True
+        self._changed_during_load = {}
+        started = datetime.utcnow()
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(User).where(
+                        User.parser_active == True,
+                        User.notifications_enabled == True,
+                        User.access_until > datetime.utcnow()
+                    )
+                )
+                entries = {u.telegram_id: self._entry(u) for u in result.scalars().all()}
+            entries.update(self._changed_during_load)
+            self._entries = {k: v for k, v in entries.items() if v is not None}
+            self._index = None
+            self.loaded = True
+            self._loaded_at = time.monotonic()
+            self._polled_at = started
+        finally:
+            self._loading = False
+            self._changed_during_load = {}
+
+    async def poll_changes(self) -> int:
+        """Применить изменения пользователей с прошлой проверки"""
+        from sqlalchemy import select
+        from bot.database import async_session
+        from bot.models import User
+
+        # С запасом на расхождение часов между процессами; повтор безвреден
+        since = self._polled_at - timedelta(seconds=config.SUBSCRIBER_POLL_INTERVAL)
+        started = datetime.utcnow()
+        async with async_session() as session:
+            result = await session.execute(select(User).where(User.updated_at >= since))
+            users = result.scalars().all()
+        for user in users:
+            self.user_changed(user)
+        self._polled_at = started
+        return len(users)
+
+    def index(self, now: datetime = None) -> SubscriberIndex:
+        """Индекс категорий по пользователям с действующим доступом"""
+        now = now or datetime.utcnow()
+        if self._index is None or (self._index_valid_until and now >= self._index_valid_until):
+            index = SubscriberIndex()
+            valid_until = None
+            for subscriber, categories, access_until in self._entries.values():
+                if access_until <= now:
+                    continue
+                index.add(subscriber, categories)
+                if valid_until is None or access_until < valid_until:
+                    valid_until = access_until
+            # Пересобираем, когда истечёт ближайший доступ
+            self._index = index
+            self._index_valid_until = valid_until
+        return self._index
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.sleep(config.SUBSCRIBER_POLL_INTERVAL)
+                if (not self.loaded or time.monotonic() - self._loaded_at
+                        >= config.SUBSCRIBER_RECONCILE_INTERVAL):
+                    before = len(self._entries)
+                    await self.load()
+                    if len(self._entries) != before:
+                        logger.info(f"[Subscribers] Reconciled: {before} -> {len(self._entries)}")
+                else:
+                    await self.poll_changes()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[Subscribers] Reconcile error: {e}")
+
+
+subscriber_registry = SubscriberRegistry()
@@ -0,0 +1,116 @@
+"""
+Фоновая обработка апдейтов Telegram из webhook.
+
+Webhook только разбирает апдейт, ставит его в очередь и сразу отвечает 200:
+долгие обработчики (GigaChat — 5–30 секунд) не держат соединение Telegram.
+Апдейты одного чата обрабатываются строго по порядку (FSM), разных чатов —
+параллельно, не больше UPDATE_CONCURRENCY одновременно. Если в очереди
+больше UPDATE_QUEUE_LIMIT апдейтов, webhook отвечает 503 и Telegram
+повторит доставку позже.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from bot.config import config
+from bot.services.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+
+def chat_key(update) -> int:
+    """Чат апдейта — в его пределах сохраняется порядок"""
+    if update.message:
+        return update.message.chat.id
+    if update.callback_query:
+        callback = update.callback_query
+        return callback.message.chat.id if callback.message else callback.from_user.id
+    return update.update_id
+
+
+class UpdateQueue:
+    def __init__(self):
+        self.dp = None
+        self.bot = None
+        # Апдейты чата, пока по нему работает обработчик; первый — текущий
+        self._chats: Dict[int, Deque[Tuple[object, float]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.ack = LatencyWindow()       # ответ webhook
+        self.wait = LatencyWindow()      # от приёма до начала обработки
+        self.handle = LatencyWindow()    # работа обработчика
+
+    def start(self, dp, bot):
+        self.dp = dp
+        self.bot = bot
+        self._slots = asyncio.Semaphore(config.UPDATE_CONCURRENCY)
+
+    async def stop(self):
+        """Дать начатому доработать UPDATE_DRAIN_TIMEOUT секунд, остальное отменить"""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=config.UPDATE_DRAIN_TIMEOUT)
+        for task in list(self._tasks):
+            task.cancel()
+
+    def submit(self, update) -> bool:
+        """Поставить апдейт в очередь; False — очередь полна или не запущена"""
+        if self._slots is None or self.pending >= config.UPDATE_QUEUE_LIMIT:
+            self.rejected += 1
+            return False
+        self.pending += 1
+        self.accepted += 1
+        item = (update, time.perf_counter())
+
+        key = chat_key(update)
+        queue = self._chats.get(key)
+        if queue is not None:
+            # Чат уже обрабатывается — апдейт дождётся своей очереди
+            queue.append(item)
+            return True
+        self._chats[key] = deque([item])
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _drain(self, key: int):
+        queue = self._chats[key]
+        try:
+            while queue:
+                update, queued_at = queue[0]
+                async with self._slots:
+                    started = time.perf_counter()
+                    self.wait.add(started - queued_at)
+                    try:
+                        await self.dp.feed_update(bot=self.bot, update=update)
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error(f"[Updates] Handler error {key}: {e}")
+                    finally:
+                        self.handle.add(time.perf_counter() - started)
+                queue.popleft()
+                self.pending -= 1
+        finally:
+            del self._chats[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "pending": self.pending,
+            "limit": config.UPDATE_QUEUE_LIMIT,
+            "busy_chats": len(self._chats),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "ack": self.ack.snapshot(),
+            "wait": self.wait.snapshot(),
+            "handle": self.handle.snapshot(),
+        }
+
+
+update_queue = UpdateQueue()
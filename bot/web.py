@@ -0,0 +1,30 @@
+"""
+Веб-роль: webhook Telegram, диспетчер aiogram, FastAPI и Mini App.
+Фоновые стадии (опрос бирж, сопоставление, рассылка) — в bot.worker;
+чтобы запустить их и здесь, задайте PIPELINE_ROLES явно.
+
+Запуск: python -m bot.web
+"""
+import os
+import time
+
+_import_started = time.perf_counter()
+
+from bot.config import config
+
+if "PIPELINE_ROLES" not in os.environ:
+    config.PIPELINE_ROLES = ""
+
+import uvicorn
+
+from bot.main import app, logger
+from bot.services.metrics import import_report
+
+
+def main():
+    logger.info(f"⏱ Imports: {import_report(_import_started)}")
+    uvicorn.run(app, host="0.0.0.0", port=config.PORT, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
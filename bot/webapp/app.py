@@ -10,8 +10,9 @@ from sqlalchemy import select
 from bot.config import config
 from bot.database import async_session
 from bot.models import User, Order, Client, ParsedOrder
-from bot.parsers.manager import parser_manager
 from bot.services.gigachat import gigachat_service
+from bot.services.pipeline import parser_stats
+from bot.services.subscribers import subscriber_registry
 
 webapp_router = APIRouter(prefix="/webapp", tags=["webapp"])
 
@@ -282,7 +283,7 @@ async def get_stats(telegram_id: int = Query(...)):
         "total_orders": len(orders),
         "by_status": statuses,
         "by_source": sources,
-        "parser_status": parser_manager.get_stats(),
+        "parser_status": await parser_stats(),
     }
 
 
@@ -320,6 +321,7 @@ async def update_profile(request: Request):
             user.categories = data["categories"]
 
         await session.commit()
+        subscriber_registry.user_changed(user)
         return {"ok": True}
 
 
@@ -339,4 +341,5 @@ async def toggle_parser(request: Request):
 
         user.parser_active = not user.parser_active
         await session.commit()
+        subscriber_registry.user_changed(user)
         return {"ok": True, "parser_active": user.parser_active}
\ No newline at end of file
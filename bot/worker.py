@@ -0,0 +1,75 @@
+"""
+Воркер: фоновые стадии конвейера без FastAPI и обработчиков бота.
+Какие стадии запускать — PIPELINE_ROLES (по умолчанию scraper, matcher, sender);
+воркеров можно запустить несколько, планировщик выберет лидера сам.
+
+Запуск: python -m bot.worker
+"""
+import asyncio
+import logging
+import signal
+import time
+
+_import_started = time.perf_counter()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+
+from bot.config import config
+from bot.database import init_db
+from bot.services.metrics import import_report, loop_lag_monitor
+from bot.services.pipeline import start_pipeline, stop_pipeline
+
+
+async def run():
+    logger.info(f"⏱ Imports: {import_report(_import_started)}")
+    roles = config.pipeline_roles
+    if not roles:
+        logger.error("❌ PIPELINE_ROLES is empty, nothing to run")
+        return
+
+    logger.info("🚀 Starting Freelance Radar worker...")
+    bot = Bot(
+        token=config.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    try:
+        await init_db()
+        logger.info("✅ Database ready")
+    except Exception as e:
+        logger.error(f"❌ Database error: {e}")
+
+    loop_lag_monitor.start()
+    await start_pipeline(bot, roles)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    logger.info("🟢 WORKER IS READY!")
+    try:
+        await stop.wait()
+    finally:
+        logger.info("🔴 Shutting down...")
+        loop_lag_monitor.stop()
+        await stop_pipeline()
+        await bot.session.close()
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Бенчмарк общего пула HTTP-соединений (user-001).
+
+Локальный HTTPS-сервер aiohttp (самоподписанный сертификат, нужен openssl)
+на 127.0.0.1-7 — по адресу на «биржу», как будто это разные хосты.
+7 источников параллельно (как stream_all) берут по 3 страницы ~60 КБ.
+- before — своя ClientSession на каждый parse(), как до user-001;
+- after  — общий HttpClient с настройками HTTP_POOL_* по умолчанию.
+
+На loopback нет сетевой задержки: цифры показывают только цену
+установки TCP+TLS, у настоящих бирж к ней добавятся DNS и 2-3 RTT.
+Адреса 127.0.0.N работают на Linux; на macOS их надо добавить на lo0.
+
+Запуск: BOT_TOKEN=0:x python scripts/bench_http_pool.py [задержка_сервера_мс]
+"""
+import asyncio
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from bot.parsers.http import HttpClient
+
+SOURCES, PAGES, CYCLES = 7, 3, 30
+PORT = 8443
+BODY = b"<html>" + b"x" * 60_000 + b"</html>"
+
+
+def make_cert(directory: str):
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key,
+         "-out", cert, "-days", "1", "-subj", "/CN=localhost"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+async def old_parse(url: str, ctx: ssl.SSLContext):
+    # Как до user-001: своя ClientSession на каждый parse()
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+        for page in range(PAGES):
+            async with session.get(f"{url}?p={page}", ssl=ctx) as resp:
+                await resp.read()
+
+
+async def new_parse(http: HttpClient, url: str, ctx: ssl.SSLContext):
+    session = await http.session()
+    for page in range(PAGES):
+        async with session.get(f"{url}?p={page}", ssl=ctx) as resp:
+            await resp.read()
+
+
+async def run(delay: float, cert: str, key: str):
+    connections = set()
+
+    async def handler(request):
+        connections.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(delay)
+        return web.Response(body=BODY, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{source}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ctx.load_cert_chain(cert, key)
+    await web.TCPSite(runner, "0.0.0.0", PORT, ssl_context=server_ctx).start()
+
+    ctx = ssl.create_default_context(cafile=cert)
+    ctx.check_hostname = False  # свой адрес 127.0.0.N на каждую «биржу»
+    urls = [f"https://127.0.0.{i + 1}:{PORT}/s{i}" for i in range(SOURCES)]
+
+    print(f"{SOURCES} sources x {PAGES} pages, {CYCLES} cycles, server delay {delay * 1000:.0f} ms")
+    try:
+        for name in ("before", "after"):
+            http = HttpClient()
+            connections.clear()
+            times = []
+            for _ in range(CYCLES):
+                started = time.perf_counter()
+                if name == "before":
+                    await asyncio.gather(*(old_parse(url, ctx) for url in urls))
+                else:
+                    await asyncio.gather(*(new_parse(http, url, ctx) for url in urls))
+                times.append(time.perf_counter() - started)
+            await http.close()
+            print(f"{name:>6}: median {statistics.median(times) * 1000:.1f} ms, "
+                  f"p95 {statistics.quantiles(times, n=20)[18] * 1000:.1f} ms, "
+                  f"{len(connections)} TCP+TLS connections")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    delay = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.02
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_cert(directory)
+        asyncio.run(run(delay, cert, key))
+
+
+if __name__ == "__main__":
+    main()
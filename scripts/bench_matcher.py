@@ -0,0 +1,126 @@
+"""
+Бенчмарк сопоставления заказов с категориями (user-011).
+
+10 000 синтетических заказов, у каждого пользователя 3 категории.
+Сравниваются:
+- per-user — как было до user-011: ключевые слова пользователя
+  перебираются для каждого заказа и каждого пользователя;
+- table    — первая версия KeywordMatcher: подстроки по категориям,
+  один раз на заказ, дальше пересечение множеств;
+- pattern  — текущий KeywordMatcher: одно скомпилированное выражение
+  по категориям, на которые кто-то подписан (как в SubscriberIndex).
+
+Запуск: BOT_TOKEN=0:x python scripts/bench_matcher.py
+"""
+import random
+import time
+
+from bot.config import config
+from bot.parsers.matcher import KeywordMatcher
+
+ORDERS = 10_000
+USERS = (1, 10, 100)
+REPEAT = 3
+
+FILLER = (
+    "нужно сделать проект срочно бюджет обсуждается опыт работы от года "
+    "требуется исполнитель задача подробности в личке оплата поэтапно "
+    "интересует качество сроки сжатые тз готово пишите с примерами работ"
+).split()
+
+
+def make_texts(rng: random.Random):
+    keywords = [kw for info in config.CATEGORIES.values() for kw in info["keywords"]]
+    texts = []
+    for _ in range(ORDERS):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(20, 60))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        texts.append(" ".join(words).lower())
+    return texts
+
+
+def make_users(rng: random.Random, count: int):
+    names = list(config.CATEGORIES)
+    return [frozenset(rng.sample(names, 3)) for _ in range(count)]
+
+
+def per_user(texts, users):
+    keywords = [
+        [kw.lower() for name in cats for kw in config.CATEGORIES[name]["keywords"]]
+        for cats in users
+    ]
+    hits = 0
+    for text in texts:
+        for user_keywords in keywords:
+            if any(kw in text for kw in user_keywords):
+                hits += 1
+    return hits
+
+
+def table(texts, users):
+    rows = [
+        (name, tuple(sorted({kw.lower() for kw in info["keywords"]}, key=len)))
+        for name, info in config.CATEGORIES.items()
+    ]
+    hits = 0
+    for text in texts:
+        matched = frozenset(name for name, kws in rows if any(kw in text for kw in kws))
+        for cats in users:
+            if not matched.isdisjoint(cats):
+                hits += 1
+    return hits
+
+
+def pattern(texts, users):
+    subscribed = frozenset().union(*users)
+    matcher = KeywordMatcher({n: i for n, i in config.CATEGORIES.items() if n in subscribed})
+    hits = 0
+    for text in texts:
+        matched = matcher.match(text)
+        for cats in users:
+            if not matched.isdisjoint(cats):
+                hits += 1
+    return hits
+
+
+def best(func, *args):
+    times, result = [], None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def check(rng: random.Random, samples: int = 20_000):
+    """Шаблон находит ровно те категории, что и поиск подстрок (и перекрытия)"""
+    matcher = KeywordMatcher(config.CATEGORIES)
+    keywords = [kw.lower() for info in config.CATEGORIES.values() for kw in info["keywords"]]
+    for _ in range(samples):
+        sep = rng.choice(("", " "))
+        text = sep.join(rng.choice(keywords + FILLER) for _ in range(6))
+        expected = frozenset(
+            name for name, info in config.CATEGORIES.items()
+            if any(kw.lower() in text for kw in info["keywords"])
+        )
+        assert matcher.match(text) == expected, text
+
+
+def main():
+    rng = random.Random(11)
+    check(rng)
+    texts = make_texts(rng)
+    print(f"{ORDERS} orders, 3 categories per user, best of {REPEAT}")
+    for count in USERS:
+        users = make_users(rng, count)
+        results = {name: best(func, texts, users)
+                   for name, func in (("per-user", per_user), ("table", table), ("pattern", pattern))}
+        hits = {r for _, r in results.values()}
+        assert len(hits) == 1, f"results differ: {results}"
+        line = ", ".join(f"{name} {t:.3f}s" for name, (t, _) in results.items())
+        print(f"{count:>4} users: {line}")
+
+
+if __name__ == "__main__":
+    main()